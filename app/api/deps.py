@@ -1,15 +1,24 @@
 from typing import Annotated
 
-from fastapi import Depends, HTTPException, status, Request
+from fastapi import (
+    Depends,
+    HTTPException,
+    Request,
+    WebSocket,
+    WebSocketException,
+    status,
+)
+from starlette.requests import HTTPConnection
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 import jwt
 
+from app.core.security import decode_access_token
 from app.core.config import settings
-from app.db.session import get_db
+from app.db.session import get_db, get_replica_db, has_recent_write
 from app.models.user import User
 from app.schemas.user import TokenData
-from app.crud.user import get_user_by_email
+from app.crud.user import get_cached_user_by_email
 
 
 # ⚡ ДЛЯ API-КЛИЕНТОВ (Bearer token)
@@ -19,8 +28,48 @@ oauth2_scheme = OAuth2PasswordBearer(
 )
 
 
+async def _get_user_by_token(
+    request: HTTPConnection,
+    db: AsyncSession,
+    replica_db: AsyncSession,
+    token: str,
+    credentials_exception: HTTPException | WebSocketException,
+) -> User:
+    """
+    Общая часть обеих зависимостей: токен -> claims -> пользователь.
+    Пользователь читается с реплики; только что зарегистрированного
+    она может еще не знать, тогда повторяем на primary
+    """
+    try:
+        payload = decode_access_token(token)
+        email = payload.get("sub")
+        if email is None:
+            raise credentials_exception
+        token_data = TokenData(email=email)
+    except jwt.InvalidTokenError:
+        raise credentials_exception
+
+    user = await get_cached_user_by_email(
+        db=replica_db,
+        email=token_data.email,
+        redis=request.app.state.redis,
+    )
+    if user is None and settings.DATABASE_REPLICA_URL:
+        user = await get_cached_user_by_email(
+            db=db,
+            email=token_data.email,
+            redis=request.app.state.redis,
+        )
+    if user is None:
+        raise credentials_exception
+
+    return user
+
+
 async def get_current_user_from_token(
+    request: Request,
     db: Annotated[AsyncSession, Depends(get_db)],
+    replica_db: Annotated[AsyncSession, Depends(get_replica_db)],
     token: str = Depends(oauth2_scheme),
 ) -> User:
     """Аутентификация для API-клиентов через Bearer token"""
@@ -33,30 +82,16 @@ async def get_current_user_from_token(
     if not token:
         raise credentials_exception
 
-    try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
-        email = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
-    except jwt.InvalidTokenError:
-        raise credentials_exception
-
-    user = await get_user_by_email(db=db, email=token_data.email)
-    if user is None:
-        raise credentials_exception
-
-    return user
+    return await _get_user_by_token(
+        request, db, replica_db, token, credentials_exception
+    )
 
 
 # 🍪 ДЛЯ ВЕБ-ИНТЕРФЕЙСА (httpOnly cookie)
 async def get_current_user_from_cookie(
     request: Request,
     db: Annotated[AsyncSession, Depends(get_db)],
+    replica_db: Annotated[AsyncSession, Depends(get_replica_db)],
 ) -> User:
     """Аутентификация для веб-интерфейса через cookie"""
     credentials_exception = HTTPException(
@@ -68,25 +103,36 @@ async def get_current_user_from_cookie(
     if not token:
         raise credentials_exception
 
-    token = token.replace("Bearer ", "")
+    token = token.removeprefix("Bearer ")
 
-    try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
-        email = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
-    except jwt.InvalidTokenError:
-        raise credentials_exception
+    return await _get_user_by_token(
+        request, db, replica_db, token, credentials_exception
+    )
 
-    user = await get_user_by_email(db=db, email=token_data.email)
-    if user is None:
+
+# 🔌 ДЛЯ WEBSOCKET (токен в ?token=)
+async def get_current_user_from_websocket(
+    websocket: WebSocket,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    replica_db: Annotated[AsyncSession, Depends(get_replica_db)],
+    token: str | None = None,
+) -> User:
+    """
+    Аутентификация WebSocket: браузер не может передать
+    заголовок Authorization при подключении, поэтому токен — в query.
+    Неактивный пользователь тоже не пускается
+    """
+    credentials_exception = WebSocketException(
+        code=status.WS_1008_POLICY_VIOLATION
+    )
+    if not token:
         raise credentials_exception
 
+    user = await _get_user_by_token(
+        websocket, db, replica_db, token, credentials_exception
+    )
+    if not user.is_active:
+        raise credentials_exception
     return user
 
 
@@ -103,8 +149,49 @@ async def get_current_active_user(
     return current_user
 
 
+# СЕССИИ ДЛЯ ЧТЕНИЯ (реплика с read-your-writes)
+async def _pick_read_db(
+    request: Request,
+    user: User,
+    db: AsyncSession,
+    replica_db: AsyncSession,
+) -> AsyncSession:
+    """
+    Сразу после своей записи пользователь читает с primary,
+    иначе мог бы не увидеть собственных изменений из-за лага реплики.
+    Соединение сессия берет только при первом запросе,
+    так что неиспользованная сессия ничего не стоит
+    """
+    if await has_recent_write(request.app.state.redis, user.id):
+        return db
+    return replica_db
+
+
+async def get_read_db(
+    request: Request,
+    current_user: Annotated[User, Depends(get_current_user_from_token)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    replica_db: Annotated[AsyncSession, Depends(get_replica_db)],
+) -> AsyncSession:
+    """Сессия для чтения данных API-клиента"""
+    return await _pick_read_db(request, current_user, db, replica_db)
+
+
+async def get_read_db_from_cookie(
+    request: Request,
+    current_user: Annotated[User, Depends(get_current_user_from_cookie)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    replica_db: Annotated[AsyncSession, Depends(get_replica_db)],
+) -> AsyncSession:
+    """Сессия для чтения данных в веб-интерфейсе"""
+    return await _pick_read_db(request, current_user, db, replica_db)
+
+
 # Алиасы для удобства импорта
 AuthUserFromToken = Annotated[User, Depends(get_current_user_from_token)]
 AuthUserFromCookie = Annotated[User, Depends(get_current_user_from_cookie)]
 ActiveUserFromToken = Annotated[User, Depends(get_current_active_user)]
 ActiveUserFromCookie = Annotated[User, Depends(get_current_active_user)]
+ActiveUserFromWebSocket = Annotated[
+    User, Depends(get_current_user_from_websocket)
+]
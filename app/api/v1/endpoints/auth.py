@@ -7,7 +7,7 @@ from datetime import timedelta
 
 from app.db.session import get_db
 from app.schemas.user import UserCreate, UserOut, Token
-from app.crud.user import get_user_by_email, create_user
+from app.crud.user import get_user_by_email, create_user, invalidate_user_cache
 from app.core.security import verify_password, create_access_token
 from app.core.config import settings
 from app.core.templates import templates
@@ -27,6 +27,7 @@ router = APIRouter()
     """,
 )
 async def register(
+    request: Request,
     user_in: UserCreate,
     db: Annotated[AsyncSession, Depends(get_db)]
 ) -> User:
@@ -37,6 +38,8 @@ async def register(
             detail="Пользователь уже создан"
         )
     user = await create_user(db=db, user_in=user_in)
+    # на случай, если в кеше остался удаленный ранее пользователь с этим email
+    await invalidate_user_cache(request.app.state.redis, user.email)
     return user
 
 
@@ -59,7 +62,7 @@ async def login(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверный логин или пароль",
         )
-    if not verify_password(form_data.password, user.hashed_password):
+    if not await verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверный логин или пароль"
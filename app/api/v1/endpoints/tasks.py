@@ -1,18 +1,67 @@
-from typing import Annotated
+import asyncio
+import csv
+import io
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    status,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import get_db
-from app.schemas.task import TaskCreate, TaskOut, TaskUpdate
+from app.core.config import settings
+from app.core.events import task_events
+from app.core.etag import http_date, modified_since, none_match
+from app.core.pagination import cursor_datetime, encode_cursor, decode_cursor
+from app.schemas.task import (
+    TaskCreate,
+    TaskOut,
+    TaskUpdate,
+    TaskBatchCreate,
+    TaskBatchUpdate,
+    TaskBatchDelete,
+    TaskChanges,
+    TaskFilter,
+    TASK_BATCH_MAX_SIZE,
+    TaskListAdapter,
+)
 from app.crud.task import (
-    get_tasks,
+    get_tasks_page,
+    get_task_changes,
+    parse_task_cursor,
+    stream_tasks,
+    tasks_ndjson,
     get_task,
     create_task,
     update_task,
     delete_task,
+    create_tasks,
+    update_tasks,
+    delete_tasks,
+    task_etag,
+    task_versions,
+    TaskNotFoundError,
+    TaskPermissionError,
+    TaskPreconditionFailedError,
+    SyncTokenExpiredError,
+)
+from app.api.deps import (
+    ActiveUserFromToken,
+    ActiveUserFromWebSocket,
+    get_read_db,
 )
-from app.api.deps import ActiveUserFromToken
 
 
 router = APIRouter()
@@ -21,32 +70,339 @@ router = APIRouter()
 @router.get(
     "/",
     response_model=list[TaskOut],
-    description="Возвращает все задачи юзера")
+    description="""
+    Возвращает задачи юзера, по умолчанию упорядоченные по id.
+    Фильтры: completed, диапазоны created_from/created_to и
+    updated_from/updated_to, q — полнотекстовый поиск по названию
+    и описанию; sort — id, created_at или updated_at, "-" — по убыванию.
+    Если страница заполнена, в заголовке X-Next-Cursor приходит курсор
+    следующей страницы — его нужно передать в ?after=
+    Страница отдается с ETag; с If-None-Match ответ будет 304,
+    пока она не изменилась.
+    """)
 async def read_tasks(
     requst: Request,
     current_user: ActiveUserFromToken,
-    db: Annotated[AsyncSession, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    filters: Annotated[TaskFilter, Depends()],
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    after: str | None = None,
+    if_none_match: Annotated[str | None, Header()] = None,
 ):
-    tasks = await get_tasks(
+    position = None
+    if after is not None:
+        try:
+            position = parse_task_cursor(filters.sort, after)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Некорректный курсор"
+            )
+    page = await get_tasks_page(
         request=requst,
         db=db,
         owner_id=current_user.id,
         skip=skip,
         limit=limit,
+        after=position,
+        filters=filters,
+    )
+    # Отдаем готовый JSON из кеша как есть, минуя повторную
+    # валидацию и сериализацию через response_model
+    headers = {"ETag": page.etag}
+    if page.next_cursor is not None:
+        headers["X-Next-Cursor"] = page.next_cursor
+    if not none_match(if_none_match, page.etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers=headers
+        )
+    return Response(
+        content=page.payload,
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+EXPORT_FIELDS = list(TaskOut.model_fields)
+
+
+async def _export_ndjson(rows_stream) -> AsyncIterator[bytes]:
+    async for rows in rows_stream:
+        yield tasks_ndjson(rows)
+
+
+def _csv_value(value):
+    # даты в том же ISO-формате, что и в JSON
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+async def _export_csv(rows_stream) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    async for rows in rows_stream:
+        writer.writerows(
+            [_csv_value(getattr(row, field)) for field in EXPORT_FIELDS]
+            for row in rows
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():  # только заголовок — задач нет
+        yield buffer.getvalue().encode()
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    description="""
+    Выгружает все задачи юзера в NDJSON или CSV.
+    Строки читаются из серверного курсора пачками и сразу отдаются
+    клиенту, поэтому память не зависит от количества задач.
+    """)
+async def export_tasks(
+    current_user: ActiveUserFromToken,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    export_format: Annotated[
+        Literal["ndjson", "csv"], Query(alias="format")
+    ] = "ndjson",
+):
+    # Сессия из get_read_db закрывается после отправки ответа,
+    # так что курсор живет все время стриминга
+    rows_stream = stream_tasks(db=db, owner_id=current_user.id)
+    if export_format == "csv":
+        body, media_type = _export_csv(rows_stream), "text/csv"
+    else:
+        body, media_type = _export_ndjson(rows_stream), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="tasks.{export_format}"'
+        },
+    )
+
+
+@router.get(
+    "/changes",
+    response_model=TaskChanges,
+    description="""
+    Дельта-синхронизация: задачи, созданные и измененные после токена
+    ?since=, и id удаленных. Без since — все задачи.
+    Если has_more, next_token нужно сразу передать в следующий запрос,
+    иначе — при следующей синхронизации.
+    Слишком старый токен — 410, нужна полная синхронизация без since.
+    Читает с primary: реплика может отставать от токена.
+    """)
+async def read_task_changes(
+    current_user: ActiveUserFromToken,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    since: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=TASK_BATCH_MAX_SIZE)] = 500,
+):
+    position = None
+    if since is not None:
+        try:
+            values = decode_cursor(since)
+            position = (cursor_datetime(values["t"]), int(values["id"]))
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Некорректный токен синхронизации"
+            )
+    try:
+        changes = await get_task_changes(
+            db=db,
+            owner_id=current_user.id,
+            since=position,
+            limit=limit,
+        )
+    except SyncTokenExpiredError:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Токен синхронизации устарел"
+        )
+    updated_at, task_id = changes.position
+    return TaskChanges(
+        changed=TaskListAdapter.validate_python(
+            changes.changed, from_attributes=True
+        ),
+        deleted=changes.deleted,
+        next_token=encode_cursor({"t": updated_at.isoformat(), "id": task_id}),
+        has_more=changes.has_more,
+    )
+
+
+async def _sse_events(owner_id: int) -> AsyncIterator[bytes]:
+    with task_events.subscribe(owner_id) as queue:
+        yield b"retry: 3000\n\n"
+        while True:
+            try:
+                async with asyncio.timeout(settings.TASK_EVENTS_PING_INTERVAL):
+                    event = await queue.get()
+            except TimeoutError:
+                # комментарий SSE: не дает прокси закрыть простаивающее
+                # соединение и позволяет заметить отключение клиента
+                yield b": ping\n\n"
+                continue
+            yield b"event: %s\ndata: %s\n\n" % (event.type.encode(), event.data)
+
+
+@router.get(
+    "/stream",
+    response_class=StreamingResponse,
+    description="""
+    Поток изменений задач юзера (Server-Sent Events).
+    События created и updated — JSON-массив задач, deleted — массив id,
+    resync — события могли потеряться, нужно догнать по /changes.
+    После подключения стоит один раз запросить /changes: события
+    до подписки в поток не попадают.
+    """)
+async def stream_task_events(current_user: ActiveUserFromToken):
+    return StreamingResponse(
+        _sse_events(current_user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def task_events_websocket(
+    websocket: WebSocket,
+    current_user: ActiveUserFromWebSocket,
+):
+    """
+    Те же события, что и /stream, по WebSocket (токен — в ?token=).
+    Сообщение: {"type": ..., "data": ...}; ping — keep-alive.
+    """
+    await websocket.accept()
+    with task_events.subscribe(current_user.id) as queue:
+        try:
+            while True:
+                try:
+                    async with asyncio.timeout(
+                        settings.TASK_EVENTS_PING_INTERVAL
+                    ):
+                        event = await queue.get()
+                except TimeoutError:
+                    await websocket.send_text('{"type":"ping","data":null}')
+                    continue
+                await websocket.send_text(
+                    f'{{"type":"{event.type}","data":{event.data.decode()}}}'
+                )
+        except WebSocketDisconnect:
+            pass
+
+
+# Пакетные операции объявлены до маршрутов с /{task_id},
+# иначе PATCH/DELETE /batch попадут в них
+
+
+@router.post(
+    "/batch",
+    response_model=list[TaskOut],
+    status_code=status.HTTP_201_CREATED,
+    description="Создает пакет задач одним запросом к БД")
+async def create_tasks_batch(
+    request: Request,
+    current_user: ActiveUserFromToken,
+    batch_in: TaskBatchCreate,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    redis = request.app.state.redis
+    tasks = await create_tasks(
+        redis=redis,
+        db=db,
+        tasks_in=batch_in.items,
+        owner_id=current_user.id
     )
     return tasks
 
 
+@router.patch(
+    "/batch",
+    response_model=list[TaskOut],
+    description="""
+    Обновляет пакет задач. Если хотя бы одна задача не найдена
+    или чужая — не обновляется ни одна.
+    """)
+async def update_tasks_batch(
+    request: Request,
+    current_user: ActiveUserFromToken,
+    batch_in: TaskBatchUpdate,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    redis = request.app.state.redis
+    try:
+        tasks = await update_tasks(
+            redis=redis,
+            db=db,
+            items=batch_in.items,
+            owner_id=current_user.id
+        )
+    except TaskNotFoundError as e:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Задачи не найдены: {e.task_ids}"
+        )
+    except TaskPermissionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Эти задачи вам не доступны: {e.task_ids}"
+        )
+    return tasks
+
+
+@router.delete(
+    "/batch",
+    status_code=status.HTTP_204_NO_CONTENT,
+    description="""
+    Удаляет пакет задач. Если хотя бы одна задача не найдена
+    или чужая — не удаляется ни одна.
+    """)
+async def delete_tasks_batch(
+    request: Request,
+    current_user: ActiveUserFromToken,
+    batch_in: TaskBatchDelete,
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    redis = request.app.state.redis
+    try:
+        await delete_tasks(
+            redis=redis,
+            db=db,
+            task_ids=batch_in.ids,
+            owner_id=current_user.id
+        )
+    except TaskNotFoundError as e:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Задачи не найдены: {e.task_ids}"
+        )
+    except TaskPermissionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Эти задачи вам не доступны: {e.task_ids}"
+        )
+    return None
+
+
 @router.get(
     "/{task_id}",
     response_model=TaskOut,
-    description="Возвращает конкретную задачу с ID")
+    description="""
+    Возвращает конкретную задачу с ID.
+    Отдает ETag и Last-Modified; If-None-Match / If-Modified-Since
+    для неизмененной задачи дают 304.
+    """)
 async def read_task(
+    response: Response,
     current_user: ActiveUserFromToken,
     task_id: int,
-    db: Annotated[AsyncSession, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    if_none_match: Annotated[str | None, Header()] = None,
+    if_modified_since: Annotated[str | None, Header()] = None,
 ):
     task = await get_task(
         db=db,
@@ -59,6 +415,20 @@ async def read_task(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Эта задача вам не доступна"
         )
+    headers = {
+        "ETag": task_etag(task),
+        "Last-Modified": http_date(task.updated_at),
+    }
+    # If-Modified-Since учитывается, только если нет If-None-Match
+    if if_none_match is not None:
+        not_modified = not none_match(if_none_match, headers["ETag"])
+    else:
+        not_modified = not modified_since(if_modified_since, task.updated_at)
+    if not_modified:
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers=headers
+        )
+    response.headers.update(headers)
     return task
 
 
@@ -69,6 +439,7 @@ async def read_task(
     description="Создает задачу для конкретного юзера")
 async def create_new_task(
     request: Request,
+    response: Response,
     current_user: ActiveUserFromToken,
     task_in: TaskCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
@@ -80,46 +451,78 @@ async def create_new_task(
         task_in=task_in,
         owner_id=current_user.id
     )
+    response.headers["ETag"] = task_etag(task)
     return task
 
 
 @router.patch(
     "/{task_id}",
     response_model=TaskOut,
-    description="Обновляет данные в задаче")
+    description="""
+    Обновляет данные в задаче.
+    С If-Match задача обновится, только если ее ETag совпадает
+    с одним из переданных, иначе 412.
+    """)
 async def update_current_task(
     request: Request,
+    response: Response,
     current_user: ActiveUserFromToken,
     task_id: int,
     task_in: TaskUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
+    if_match: Annotated[str | None, Header()] = None,
 ):
     redis = request.app.state.redis
-    task = await get_task(db, task_id)
-    if not task:
+    try:
+        task = await update_task(
+            redis=redis,
+            db=db,
+            task_id=task_id,
+            owner_id=current_user.id,
+            task_in=task_in,
+            versions=task_versions(if_match, task_id) if if_match else None,
+        )
+    except TaskNotFoundError:
         raise HTTPException(status_code=404, detail="Task not found")
-    if task.owner_id != current_user.id:
+    except TaskPermissionError:
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    task = await update_task(redis=redis, db=db, task=task, task_in=task_in)
+    except TaskPreconditionFailedError:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Task has been modified"
+        )
+    response.headers["ETag"] = task_etag(task)
     return task
 
 
 @router.delete(
     "/{task_id}",
     status_code=status.HTTP_204_NO_CONTENT,
-    description="Удаляет задачу."
+    description="Удаляет задачу. If-Match — как у PATCH."
     )
 async def delete_current_task(
     request: Request,
     current_user: ActiveUserFromToken,
     task_id: int,
     db: Annotated[AsyncSession, Depends(get_db)],
+    if_match: Annotated[str | None, Header()] = None,
 ):
     redis = request.app.state.redis
-    task = await get_task(db, task_id)
-    if not task:
+    try:
+        await delete_task(
+            redis=redis,
+            db=db,
+            task_id=task_id,
+            owner_id=current_user.id,
+            versions=task_versions(if_match, task_id) if if_match else None,
+        )
+    except TaskNotFoundError:
         raise HTTPException(status_code=404, detail="Task not found")
-    if task.owner_id != current_user.id:
+    except TaskPermissionError:
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    await delete_task(redis=redis, db=db, task_id=task_id)
+    except TaskPreconditionFailedError:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Task has been modified"
+        )
     return None
@@ -5,16 +5,23 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.responses import RedirectResponse
 
 from app.db.session import get_db
-from app.crud.user import get_user_by_email, create_user
+from app.crud.user import get_user_by_email, create_user, invalidate_user_cache
 from app.schemas.user import UserCreate
 from app.core.security import verify_password, create_access_token
 from app.core.config import settings
 from app.core.templates import templates
 from app.crud.task import get_tasks
 from app.models.user import User
-from app.api.deps import get_current_user_from_cookie
+from app.api.deps import get_current_user_from_cookie, get_read_db_from_cookie
 from app.schemas.task import TaskCreate, TaskUpdate
-from app.crud.task import create_task, get_task, delete_task, update_task
+from app.crud.task import (
+    create_task,
+    get_task,
+    delete_task,
+    update_task,
+    TaskNotFoundError,
+    TaskPermissionError,
+)
 from app.celery.email import send_welcome_email
 
 
@@ -56,6 +63,7 @@ async def register_web(
     # 2. Создать пользователя
     user_in = UserCreate(email=email, password=password)
     user = await create_user(db, user_in)
+    await invalidate_user_cache(request.app.state.redis, user.email)
 
     # 2.1 Celery отправка сообщения
     send_welcome_email.delay(email)
@@ -81,7 +89,7 @@ async def login_web(
         )
 
     # 2. Проверить пароль
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password(password, user.hashed_password):
         return templates.TemplateResponse(
             "auth/login.html",
             {"request": request, "error": "Неверный email или пароль"}
@@ -106,7 +114,7 @@ async def login_web(
 @router.get("/dashboard", include_in_schema=False)
 async def dashboard(
     request: Request,
-    db: Annotated[AsyncSession, Depends(get_db)],
+    db: Annotated[AsyncSession, Depends(get_read_db_from_cookie)],
     current_user: User = Depends(get_current_user_from_cookie),  # ЯВНО
     skip: int = 0,
     limit: int = 100
@@ -133,7 +141,6 @@ async def dashboard(
 @router.get("/tasks/create", include_in_schema=False)
 async def create_task_form(
     request: Request,
-    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user_from_cookie)
 ):
     """Форма создания задачи"""
@@ -145,6 +152,7 @@ async def create_task_form(
 
 @router.post("/tasks/create", include_in_schema=False)
 async def create_task_web(
+    request: Request,
     title: str = Form(...),
     description: str = Form(None),
     db: AsyncSession = Depends(get_db),
@@ -152,7 +160,12 @@ async def create_task_web(
 ):
     """Создание задачи через веб-форму"""
     task_in = TaskCreate(title=title, description=description)
-    await create_task(db, task_in, current_user.id)
+    await create_task(
+        redis=request.app.state.redis,
+        db=db,
+        task_in=task_in,
+        owner_id=current_user.id
+    )
     return RedirectResponse(url="/dashboard", status_code=302)
 
 
@@ -164,10 +177,15 @@ async def delete_task_web(
     current_user: User = Depends(get_current_user_from_cookie)
 ):
     """Удаление задачи через веб"""
-    task = await get_task(db, task_id)
-    if not task or task.owner_id != current_user.id:
+    try:
+        await delete_task(
+            redis=request.app.state.redis,
+            db=db,
+            task_id=task_id,
+            owner_id=current_user.id
+        )
+    except (TaskNotFoundError, TaskPermissionError):
         raise HTTPException(status_code=403)
-    await delete_task(db, task_id)
     return RedirectResponse(url="/dashboard", status_code=302)
 
 
@@ -175,7 +193,7 @@ async def delete_task_web(
 async def edit_task_form(
     request: Request,
     task_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db_from_cookie),
     current_user: User = Depends(get_current_user_from_cookie)
 ):
     """Форма редактирования задачи"""
@@ -210,22 +228,24 @@ async def edit_task_web(
     current_user: User = Depends(get_current_user_from_cookie)
 ):
     """Сохранение изменений задачи"""
-    # 1. Получаем задачу
-    task = await get_task(db, task_id)
-
-    # 2. Проверяем существование и владельца
-    if not task:
-        raise HTTPException(status_code=404, detail="Задача не найдена")
-    if task.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Нет доступа")
-
-    # 3. Обновляем задачу
+    # 1. Обновляем задачу (существование и владелец проверяются там же)
     task_in = TaskUpdate(
         title=title,
         description=description if description else None,
         completed=completed
     )
-    await update_task(db, task, task_in)
+    try:
+        await update_task(
+            redis=request.app.state.redis,
+            db=db,
+            task_id=task_id,
+            owner_id=current_user.id,
+            task_in=task_in
+        )
+    except TaskNotFoundError:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    except TaskPermissionError:
+        raise HTTPException(status_code=403, detail="Нет доступа")
 
-    # 4. Редирект обратно на дашборд
+    # 2. Редирект обратно на дашборд
     return RedirectResponse(url="/dashboard", status_code=302)
\ No newline at end of file
@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.schedules import crontab
 
 from app.core.config import settings
 
@@ -6,7 +7,7 @@ celery = Celery(
     "app.celery",  # обычно по имени модуля
     broker=settings.REDIS_URL,  # куда класть задачи
     backend=settings.REDIS_URL,   # куда класть результаты
-    include=['app.celery.email']   # or autodiscover_tasks / где искать
+    include=['app.celery.email', 'app.celery.maintenance']
 )
 
 
@@ -20,3 +21,11 @@ celery.conf.update(
     task_time_limit=30 * 60,
     task_soft_time_limit=60
 )
+
+# Периодические задачи (celery beat; в docker-compose — воркер с -B)
+celery.conf.beat_schedule = {
+    'prune-task-deletions': {
+        'task': 'app.celery.maintenance.prune_old_task_deletions',
+        'schedule': crontab(hour=3, minute=0),
+    },
+}
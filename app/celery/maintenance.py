@@ -0,0 +1,26 @@
+import asyncio
+import logging
+
+from app.celery.app import celery
+from app.crud.task import prune_task_deletions
+from app.db.session import async_session_maker, engine
+
+
+logger = logging.getLogger(__name__)
+
+
+async def _prune_task_deletions() -> int:
+    try:
+        async with async_session_maker() as db:
+            return await prune_task_deletions(db)
+    finally:
+        # соединения asyncpg привязаны к event loop этого вызова
+        await engine.dispose()
+
+
+@celery.task
+def prune_old_task_deletions() -> int:
+    """Чистит журнал удалений задач от записей старше срока хранения"""
+    deleted = asyncio.run(_prune_task_deletions())
+    logger.info(f"Pruned {deleted} task deletions")
+    return deleted
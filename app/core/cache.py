@@ -0,0 +1,379 @@
+import asyncio
+import logging
+import math
+import random
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable, Hashable
+from contextlib import asynccontextmanager
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline, PubSub
+from redis.exceptions import ResponseError
+
+from app.core.config import settings
+from app.core.metrics import CACHE_EVICTIONS, CACHE_HITS, CACHE_MISSES
+
+
+logger = logging.getLogger(__name__)
+
+# Канал, через который воркеры сообщают друг другу об инвалидации
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Все локальные кеши процесса по имени — нужны слушателю pub/sub
+_local_caches: dict[str, "LocalCache"] = {}
+
+
+class LocalCache:
+    """
+    LRU-кеш с TTL в памяти одного воркера.
+    Записи можно объединять в группы (например, все страницы задач
+    одного пользователя) и сбрасывать группу целиком.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (expires_at, group, value)
+        self._data: OrderedDict[Hashable, tuple[float, str | None, Any]] = (
+            OrderedDict()
+        )
+        self._groups: dict[str, set[Hashable]] = {}
+        # Версии недавно сброшенных групп. Словарь ограничен maxsize:
+        # для вытесненных групп версией считается _version_floor
+        self._group_versions: OrderedDict[str, int] = OrderedDict()
+        self._version_clock = 0
+        self._version_floor = 0
+        self._hits = CACHE_HITS.labels(cache=name, tier="local")
+        self._misses = CACHE_MISSES.labels(cache=name, tier="local")
+        self._evictions = CACHE_EVICTIONS.labels(cache=name, tier="local")
+        _local_caches[name] = self
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._data.get(key)
+        if entry is None:
+            self._misses.inc()
+            return None
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self._misses.inc()
+            return None
+        self._data.move_to_end(key)
+        self._hits.inc()
+        return value
+
+    def group_version(self, group: Hashable) -> int:
+        """
+        Текущая версия группы. Читается до загрузки значения и передается
+        в set(): если группу успели сбросить, устаревшее значение не сохранится.
+        """
+        return self._group_versions.get(str(group), self._version_floor)
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: float | None = None,
+        group: Hashable | None = None,
+        version: int | None = None,
+    ) -> None:
+        group = str(group) if group is not None else None
+        if version is not None and version != self.group_version(group):
+            return
+        if key in self._data:
+            self._remove(key)
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, group, value)
+        if group is not None:
+            self._groups.setdefault(group, set()).add(key)
+        while len(self._data) > self.maxsize:
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self._evictions.inc()
+
+    def delete(self, key: Hashable) -> None:
+        if key in self._data:
+            self._remove(key)
+
+    def invalidate_group(self, group: Hashable) -> None:
+        group = str(group)
+        self._version_clock += 1
+        self._group_versions[group] = self._version_clock
+        self._group_versions.move_to_end(group)
+        if len(self._group_versions) > self.maxsize:
+            _, self._version_floor = self._group_versions.popitem(last=False)
+        for key in self._groups.pop(group, ()):
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._groups.clear()
+        self._group_versions.clear()
+        self._version_clock += 1
+        self._version_floor = self._version_clock
+
+    def _remove(self, key: Hashable) -> None:
+        _, group, _ = self._data.pop(key)
+        if group is not None:
+            keys = self._groups.get(group)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._groups[group]
+
+
+# Защита от stampede: когда популярный ключ истекает, его пересчитывает
+# один запрос, а не все одновременно
+
+
+class SingleFlight:
+    """
+    Склеивает одновременные загрузки одного ключа внутри воркера:
+    загрузку выполняет первый вызов, остальные ждут его результата.
+    Если первый вызов отменили, ожидающие повторяют загрузку сами.
+    """
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        while (future := self._inflight.get(key)) is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise  # отменили нас самих
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await load()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # без ожидающих asyncio не ругается в лог
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+
+async def try_lock(redis: Redis, key: str, ttl: float) -> bool:
+    """
+    Короткая блокировка между воркерами (SET NX). Явно не снимается:
+    держатель успевает записать значение, а при сбое блокировка
+    сама истечет через ttl секунд.
+    """
+    return bool(
+        await redis.set(f"lock:{key}", 1, nx=True, px=int(ttl * 1000))
+    )
+
+
+def should_refresh_early(
+    expires_at: float,
+    computed_in: float,
+    beta: float = 1.0,
+) -> bool:
+    """
+    Вероятностное раннее обновление (XFetch): чем ближе истечение и
+    чем дольше считается значение, тем вероятнее, что текущий запрос
+    обновит его заранее. Так значение не истекает одновременно для всех.
+    """
+    # 1 - random() лежит в (0, 1], логарифм определен
+    jitter = -computed_in * beta * math.log(1.0 - random.random())
+    return time.time() + jitter >= expires_at
+
+
+# Пакетные операции: несколько команд за один round trip
+
+
+async def get_many(redis: Redis, keys: list[str]) -> list[bytes | None]:
+    """Значения нескольких ключей одной командой MGET (атомарно)."""
+    return await redis.mget(keys)
+
+
+@asynccontextmanager
+async def batch(redis: Redis) -> AsyncIterator[Pipeline]:
+    """
+    Команды, отправленные внутри блока, уходят в Redis одним пакетом
+    при выходе из него. Ответы команд внутри блока недоступны.
+    Функции вида `await redis.<команда>(...)` можно вызывать
+    с пакетом вместо клиента — команды просто встанут в очередь.
+    """
+    async with redis.pipeline(transaction=False) as pipe:
+        yield pipe
+        await pipe.execute()
+
+
+async def publish_invalidation(
+    redis: Redis,
+    cache: LocalCache,
+    group: Hashable,
+) -> None:
+    """
+    Рассылает воркерам сообщение о сбросе группы через Redis pub/sub.
+    Свой локальный кеш вызывающий сбрасывает сам — после того, как
+    изменение дошло до Redis: если сбросить раньше, параллельный запрос
+    успеет положить в кеш старое значение уже под новой версией группы.
+    """
+    await redis.publish(INVALIDATION_CHANNEL, f"{cache.name}:{group}")
+
+
+def _handle_invalidation(data: bytes) -> None:
+    name, _, group = data.decode().partition(":")
+    cache = _local_caches.get(name)
+    if cache is not None:
+        cache.invalidate_group(group)
+
+
+# Client-side caching горячих ключей Redis.
+# Redis сам присылает ключи, изменившиеся под отслеживаемыми префиксами
+# (CLIENT TRACKING ... BCAST), в канал TRACKING_CHANNEL — так значение
+# можно держать в памяти воркера, не опрашивая Redis на каждый запрос.
+# Асинхронный клиент redis-py сам client-side caching не умеет,
+# поэтому используется RESP2-вариант с перенаправлением в pub/sub.
+TRACKING_CHANNEL = "__redis__:invalidate"
+# Как часто проверять, что отслеживание не сломалось (секунды)
+TRACKING_CHECK_INTERVAL = 5.0
+
+redis_key_cache = LocalCache(
+    "redis_keys",
+    maxsize=settings.REDIS_CLIENT_CACHE_SIZE,
+    ttl=settings.REDIS_CLIENT_CACHE_TTL,
+)
+_tracked_prefixes: set[str] = set()
+# Включается слушателем, только пока Redis присылает инвалидации
+_tracking_active = False
+# Отсутствующий ключ тоже кешируется
+_MISSING = object()
+
+
+def tracking_active() -> bool:
+    """Значения из cached_get сейчас актуальны без обращения к Redis."""
+    return _tracking_active
+
+
+def track_prefix(prefix: str) -> None:
+    """Регистрирует префикс ключей, которые можно читать через cached_get."""
+    _tracked_prefixes.add(prefix)
+
+
+async def cached_get(redis: Redis, key: str) -> bytes | None:
+    """
+    GET с кешем в памяти воркера. Ключ должен начинаться с префикса,
+    зарегистрированного через track_prefix. Пока отслеживание
+    не работает (выключено или слушатель переподключается),
+    это обычный GET.
+    """
+    if not _tracking_active:
+        return await redis.get(key)
+    value = redis_key_cache.get(key)
+    if value is not None:
+        return None if value is _MISSING else value
+    version = redis_key_cache.group_version(key)
+    value = await redis.get(key)
+    redis_key_cache.set(
+        key,
+        _MISSING if value is None else value,
+        group=key,
+        version=version,
+    )
+    return value
+
+
+def _handle_key_invalidation(keys: list[bytes] | None) -> None:
+    # None приходит после FLUSHDB/FLUSHALL
+    if keys is None:
+        redis_key_cache.clear()
+        return
+    for key in keys:
+        redis_key_cache.invalidate_group(key.decode())
+
+
+async def _enable_tracking(pubsub: PubSub, tracker: Redis) -> None:
+    """
+    Включает отслеживание на выделенном соединении tracker
+    с перенаправлением уведомлений в соединение pubsub.
+    CLIENT ID нужно узнать до SUBSCRIBE: после него в RESP2
+    другие команды на этом соединении запрещены.
+    """
+    await pubsub.connect()
+    await pubsub.connection.send_command("CLIENT", "ID")
+    client_id = await pubsub.connection.read_response()
+    await tracker.client_tracking_on(
+        clientid=client_id,
+        bcast=True,
+        prefix=sorted(_tracked_prefixes),
+    )
+
+
+async def _check_tracking(tracker: Redis) -> None:
+    """
+    Если соединение tracker или pubsub переподключилось, Redis перестает
+    присылать инвалидации — тогда слушатель должен начать заново.
+    """
+    info = await tracker.client_trackinginfo()
+    flags = {flag.decode() for flag in dict(zip(info[::2], info[1::2]))["flags"]}
+    if "on" not in flags or "broken_redirect" in flags:
+        raise ConnectionError(f"Redis tracking lost: {sorted(flags)}")
+
+
+async def listen_invalidations(redis: Redis) -> None:
+    """
+    Фоновая задача воркера: слушает канал инвалидации,
+    а при REDIS_CLIENT_CACHE — и уведомления CLIENT TRACKING.
+    После обрыва соединения сообщения могли потеряться,
+    поэтому при переподключении локальные кеши очищаются полностью.
+    """
+    global _tracking_active
+    tracking = settings.REDIS_CLIENT_CACHE and bool(_tracked_prefixes)
+    while True:
+        try:
+            async with redis.pubsub() as pubsub, redis.client() as tracker:
+                channels = [INVALIDATION_CHANNEL]
+                if tracking:
+                    try:
+                        await _enable_tracking(pubsub, tracker)
+                        channels.append(TRACKING_CHANNEL)
+                    except ResponseError as e:
+                        # сервер не умеет CLIENT TRACKING (Redis < 6)
+                        logger.warning(f"Redis client-side caching disabled: {e}")
+                        tracking = False
+                await pubsub.subscribe(*channels)
+                for cache in _local_caches.values():
+                    cache.clear()
+                _tracking_active = tracking
+                checked_at = time.monotonic()
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True,
+                        timeout=TRACKING_CHECK_INTERVAL,
+                    )
+                    if message is not None and message["type"] == "message":
+                        if message["channel"] == TRACKING_CHANNEL.encode():
+                            _handle_key_invalidation(message["data"])
+                        else:
+                            _handle_invalidation(message["data"])
+                    if (
+                        tracking
+                        and time.monotonic() - checked_at >= TRACKING_CHECK_INTERVAL
+                    ):
+                        await _check_tracking(tracker)
+                        checked_at = time.monotonic()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Cache invalidation listener failed: {e}")
+            await asyncio.sleep(1)
+        finally:
+            _tracking_active = False
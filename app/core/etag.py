@@ -0,0 +1,54 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+
+def content_etag(*parts: bytes) -> str:
+    """Сильный ETag по содержимому ответа"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part)
+    return f'"{digest.hexdigest()}"'
+
+
+def parse_etags(header: str) -> list[str]:
+    """
+    Разбирает If-Match / If-None-Match: "*" или список ETag через запятую.
+    Слабые метки (W/"...") возвращаются как есть.
+    """
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def none_match(header: str | None, etag: str) -> bool:
+    """
+    Выполнено ли условие If-None-Match (False — можно ответить 304).
+    Для GET сравнение слабое: W/"x" совпадает с "x".
+    """
+    if header is None:
+        return True
+    for tag in parse_etags(header):
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return False
+    return True
+
+
+def http_date(value: datetime) -> str:
+    """Дата для Last-Modified. Время в БД хранится без пояса, в UTC"""
+    return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def modified_since(header: str | None, value: datetime) -> bool:
+    """
+    Выполнено ли условие If-Modified-Since (False — можно ответить 304).
+    HTTP-дата с точностью до секунды; нечитаемый заголовок игнорируется.
+    """
+    if header is None:
+        return True
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return True
+    if since.tzinfo is None:
+        return True
+    since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(microsecond=0) > since
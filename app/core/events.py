@@ -0,0 +1,157 @@
+import asyncio
+import logging
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from redis.asyncio import Redis
+
+from app.core.config import settings
+from app.core.metrics import TASK_EVENTS_DROPPED, TASK_EVENTS_SUBSCRIBERS
+
+
+logger = logging.getLogger(__name__)
+
+# Канал событий задач всех пользователей.
+# Сообщение: b"<owner_id> <type> <data>", data — готовый JSON
+TASK_EVENTS_CHANNEL = "tasks:events"
+
+
+class TaskEvent(NamedTuple):
+    type: str
+    data: bytes
+
+
+# Сколько секунд ждать сообщения за один вызов: дольше
+# socket_timeout соединения с Redis читать нельзя
+LISTEN_TIMEOUT = 1.0
+
+# События могли потеряться (переполнение очереди клиента,
+# обрыв связи с Redis) — клиенту нужно догнать через /tasks/changes
+RESYNC_EVENT = TaskEvent("resync", b"null")
+
+
+async def publish_task_event(
+    redis: Redis,
+    owner_id: int,
+    event: TaskEvent,
+) -> None:
+    """Рассылает событие всем воркерам; redis может быть пакетом (batch)"""
+    await redis.publish(
+        TASK_EVENTS_CHANNEL,
+        b"%d %s %s" % (owner_id, event.type.encode(), event.data),
+    )
+
+
+class Subscription:
+    """
+    Очередь событий одного подключения. Заменяет asyncio.Queue:
+    та держит три deque и Event (~3 КБ), а простаивающих подключений
+    на воркере — десятки тысяч. Читатель у очереди всегда один.
+    """
+    __slots__ = ("maxsize", "_events", "_waiter")
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        # событий в очереди мало, список дешевле пустой deque
+        self._events: list[TaskEvent] = []
+        self._waiter: asyncio.Future | None = None
+
+    def qsize(self) -> int:
+        return len(self._events)
+
+    def put_nowait(self, event: TaskEvent) -> None:
+        """
+        Переполненная очередь заменяется одним resync: клиент
+        не успевает читать, копить для него события бессмысленно —
+        он догонит по /tasks/changes
+        """
+        if len(self._events) >= self.maxsize:
+            TASK_EVENTS_DROPPED.inc(len(self._events))
+            self._events.clear()
+            event = RESYNC_EVENT
+        self._events.append(event)
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def get_nowait(self) -> TaskEvent:
+        return self._events.pop(0)
+
+    async def get(self) -> TaskEvent:
+        while not self._events:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return self._events.pop(0)
+
+
+class EventHub:
+    """
+    Раздача событий задач клиентам, подключенным к воркеру.
+    Все подключения воркера обслуживает один подписчик Redis pub/sub:
+    сообщение разбирается один раз и раскладывается в очереди
+    подключений владельца задач. Подключение без событий — это только
+    ограниченная очередь, соединений с Redis и БД оно не держит.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._queues: dict[int, set[Subscription]] = {}
+
+    @contextmanager
+    def subscribe(self, owner_id: int) -> Iterator[Subscription]:
+        """Очередь событий пользователя на время подключения"""
+        queue = Subscription(self.queue_size)
+        self._queues.setdefault(owner_id, set()).add(queue)
+        TASK_EVENTS_SUBSCRIBERS.inc()
+        try:
+            yield queue
+        finally:
+            queues = self._queues.get(owner_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._queues[owner_id]
+            TASK_EVENTS_SUBSCRIBERS.dec()
+
+    def dispatch(self, owner_id: int, event: TaskEvent) -> None:
+        for queue in self._queues.get(owner_id, ()):
+            queue.put_nowait(event)
+
+    def dispatch_all(self, event: TaskEvent) -> None:
+        for queues in self._queues.values():
+            for queue in queues:
+                queue.put_nowait(event)
+
+    def _handle_message(self, data: bytes) -> None:
+        owner_id, event_type, payload = data.split(b" ", 2)
+        self.dispatch(int(owner_id), TaskEvent(event_type.decode(), payload))
+
+    async def listen(self, redis: Redis) -> None:
+        """
+        Фоновая задача воркера: единственный подписчик канала событий.
+        После переподключения все клиенты получают resync —
+        за время обрыва события могли потеряться.
+        """
+        while True:
+            try:
+                async with redis.pubsub() as pubsub:
+                    await pubsub.subscribe(TASK_EVENTS_CHANNEL)
+                    self.dispatch_all(RESYNC_EVENT)
+                    while True:
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True,
+                            timeout=LISTEN_TIMEOUT,
+                        )
+                        if message is not None and message["type"] == "message":
+                            self._handle_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Task events listener failed: {e}")
+                await asyncio.sleep(1)
+
+
+task_events = EventHub(settings.TASK_EVENTS_QUEUE_SIZE)
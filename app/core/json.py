@@ -0,0 +1,24 @@
+"""
+Общий JSON-кодировщик приложения на orjson: ответы API и готовые
+JSON-payload в кеше и событиях задач. datetime, UUID и dataclass
+orjson кодирует сам, без default-хука; naive datetime — в том же
+ISO-формате, что и pydantic, поэтому ответы не меняются.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+
+loads = orjson.loads
+
+
+class ORJSONResponse(JSONResponse):
+    """Класс ответа по умолчанию: JSON из response_model кодирует orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
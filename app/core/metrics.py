@@ -0,0 +1,182 @@
+import os
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    make_asgi_app,
+    multiprocess,
+)
+
+from app.core.profiling import QueryProfile
+
+
+# Несколько воркеров (uvicorn --workers, gunicorn): каждый процесс пишет
+# метрики в файлы PROMETHEUS_MULTIPROC_DIR, а /metrics любого воркера
+# собирает их вместе. Каталог должен быть пустым при старте сервиса;
+# режим multiprocess_mode у Gauge задает, как складывать процессы
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+def make_metrics_app():
+    """ASGI-приложение для /metrics"""
+    if not MULTIPROCESS:
+        return make_asgi_app()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return make_asgi_app(registry)
+
+
+def mark_process_dead() -> None:
+    """
+    Убирает живые Gauge (livesum) остановившегося воркера из суммы.
+    Вызывается при остановке приложения; после падения воркера его
+    значения остаются до перезапуска сервиса с чистым каталогом
+    """
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+# HTTP: route — шаблон пути (/api/v1/tasks/{task_id}), а не сам путь,
+# чтобы число рядов не росло с количеством задач
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки запроса, включая отправку тела ответа",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Запросы в обработке",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+# Запросы к БД: по отдельности и в сумме на один HTTP-запрос
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Время одного запроса к БД",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "Запросов к БД за один HTTP-запрос",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds",
+    "Суммарное время запросов к БД за один HTTP-запрос",
+    ["route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+
+@dataclass
+class RequestStats:
+    """Счетчики текущего HTTP-запроса, их заполняют события движка БД"""
+    db_queries: int = 0
+    db_time: float = 0.0
+    # подробности для разработки, только при DB_QUERY_PROFILING
+    profile: QueryProfile | None = None
+
+
+request_stats: ContextVar[RequestStats | None] = ContextVar(
+    "request_stats", default=None
+)
+
+# Redis: пакет команд (pipeline) — одна команда PIPELINE
+REDIS_COMMAND_DURATION = Histogram(
+    "redis_command_duration_seconds",
+    "Задержка команды Redis, включая ожидание соединения",
+    ["command"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 0.5),
+)
+
+# Кеши: cache — логическое имя кеша (tasks, ...),
+# tier — уровень (local — память воркера, redis — общий кеш)
+CACHE_HITS = Counter(
+    "cache_hits_total",
+    "Попадания в кеш",
+    ["cache", "tier"],
+)
+CACHE_MISSES = Counter(
+    "cache_misses_total",
+    "Промахи кеша",
+    ["cache", "tier"],
+)
+CACHE_EVICTIONS = Counter(
+    "cache_evictions_total",
+    "Вытеснения из кеша по размеру",
+    ["cache", "tier"],
+)
+
+# Пул хеширования паролей
+PASSWORD_HASH_PENDING = Gauge(
+    "password_hash_pending",
+    "Задачи хеширования паролей в очереди и в работе",
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_QUEUE_WAIT = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Ожидание свободного потока в пуле хеширования",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Время хеширования/проверки пароля",
+    ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+
+# Пулы соединений с БД: pool — primary или replica
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Соединения с БД, выданные из пула",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Соединения сверх pool_size (max_overflow)",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Ожидание свободного соединения в пуле",
+    ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+# Пул соединений с Redis — по каждому воркеру отдельно
+REDIS_POOL_IN_USE = Gauge(
+    "redis_pool_in_use",
+    "Соединения с Redis, выданные из пула",
+    multiprocess_mode="all",
+)
+REDIS_POOL_IDLE = Gauge(
+    "redis_pool_idle",
+    "Открытые соединения с Redis, свободные в пуле",
+    multiprocess_mode="all",
+)
+REDIS_POOL_WAIT = Histogram(
+    "redis_pool_wait_seconds",
+    "Ожидание свободного соединения с Redis",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1, 5),
+)
+
+# Push-события задач (SSE / WebSocket)
+TASK_EVENTS_SUBSCRIBERS = Gauge(
+    "task_events_subscribers",
+    "Подключения, подписанные на события задач",
+    multiprocess_mode="livesum",
+)
+TASK_EVENTS_DROPPED = Counter(
+    "task_events_dropped_total",
+    "События, выброшенные из переполненной очереди клиента",
+)
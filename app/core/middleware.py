@@ -0,0 +1,79 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import (
+    DB_QUERIES_PER_REQUEST,
+    DB_TIME_PER_REQUEST,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS_IN_PROGRESS,
+    RequestStats,
+    request_stats,
+)
+from app.core.profiling import QueryProfile, report_profile
+
+
+def _route_label(scope: Scope) -> str:
+    """
+    Шаблон маршрута, который обработал запрос. Роутер дописывает его
+    в scope; для смонтированных приложений (/static, /metrics) —
+    префикс монтирования. Ненайденные пути собираются в один ряд
+    """
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    return scope.get("root_path") or "<unmatched>"
+
+
+class MetricsMiddleware:
+    """
+    Время, статус и число запросов к БД для каждого HTTP-запроса.
+    Чистый ASGI, а не BaseHTTPMiddleware: тело ответа не буферизуется,
+    и время стриминга (экспорт, SSE) входит в длительность запроса.
+    При DB_QUERY_PROFILING ответ получает заголовок Server-Timing
+    с запросами к БД до начала ответа, а полный профиль пишется в лог
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500  # если приложение упало, не начав ответ
+        stats = RequestStats()
+        if settings.DB_QUERY_PROFILING:
+            stats.profile = QueryProfile()
+        token = request_stats.set(stats)
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method=method)
+        in_progress.inc()
+        start = time.perf_counter()
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if stats.profile is not None:
+                    message["headers"] = [
+                        *message.get("headers", ()),
+                        (b"server-timing", stats.profile.server_timing()),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = _route_label(scope)
+            HTTP_REQUEST_DURATION.labels(
+                method=method, route=route, status=status
+            ).observe(time.perf_counter() - start)
+            DB_QUERIES_PER_REQUEST.labels(route=route).observe(stats.db_queries)
+            DB_TIME_PER_REQUEST.labels(route=route).observe(stats.db_time)
+            in_progress.dec()
+            if stats.profile is not None:
+                report_profile(method, route, stats.profile)
+            request_stats.reset(token)
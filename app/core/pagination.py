@@ -0,0 +1,39 @@
+import base64
+import json
+from datetime import datetime
+
+
+def encode_cursor(values: dict) -> str:
+    """
+    Упаковывает позицию последнего элемента страницы в непрозрачный курсор.
+    Клиент не должен разбирать курсор — только вернуть его в ?after=.
+    """
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> dict:
+    """
+    Распаковывает курсор, полученный от клиента.
+    При любой ошибке формата выбрасывает ValueError.
+    """
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except ValueError as e:  # binascii.Error и JSONDecodeError — наследники
+        raise ValueError("Malformed cursor") from e
+    if not isinstance(values, dict):
+        raise ValueError("Malformed cursor")
+    return values
+
+
+def cursor_datetime(value: str) -> datetime:
+    """
+    Время из курсора. Сервер кладет туда naive-время колонок БД;
+    время с часовым поясом с ними не сравнить — ValueError
+    (не строка — TypeError)
+    """
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        raise ValueError("Malformed cursor")
+    return moment
@@ -0,0 +1,68 @@
+import json
+import logging
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryProfile:
+    """
+    Запросы к БД одного HTTP-запроса в режиме DB_QUERY_PROFILING.
+    Запросы считаются по тексту: asyncpg получает параметры отдельно
+    ($1, $2), поэтому N одинаковых запросов с разными id — это N+1
+    """
+    statements: Counter[str] = field(default_factory=Counter)
+    # ленивые загрузки связей: "Task.owner", "User.tasks"
+    lazy_loads: Counter[str] = field(default_factory=Counter)
+    db_time: float = 0.0
+
+    @property
+    def queries(self) -> int:
+        return self.statements.total()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.statements[statement] += 1
+        self.db_time += elapsed
+
+    def duplicates(self) -> dict[str, int]:
+        return {
+            statement: count
+            for statement, count in self.statements.items() if count > 1
+        }
+
+    def server_timing(self) -> bytes:
+        """Значение заголовка Server-Timing (время в миллисекундах)"""
+        return b'db;dur=%.1f;desc="%d queries"' % (
+            self.db_time * 1000, self.queries
+        )
+
+
+# Получатели профилей завершенных запросов: (method, route, profile).
+# Через них плагин query_budget в тестах проверяет число запросов
+profile_listeners: list[Callable[[str, str, QueryProfile], None]] = []
+
+
+def report_profile(method: str, route: str, profile: QueryProfile) -> None:
+    """
+    Одна строка лога с JSON на запрос. Повторы и ленивые загрузки
+    поднимают уровень до warning — их стоит исправить
+    """
+    duplicates = profile.duplicates()
+    summary = {
+        "method": method,
+        "route": route,
+        "queries": profile.queries,
+        "db_time_ms": round(profile.db_time * 1000, 1),
+        "duplicates": duplicates,
+        "lazy_loads": dict(profile.lazy_loads),
+    }
+    level = (
+        logging.WARNING if duplicates or profile.lazy_loads else logging.INFO
+    )
+    logger.log(level, f"Query profile: {json.dumps(summary, ensure_ascii=False)}")
+    for listener in profile_listeners:
+        listener(method, route, profile)
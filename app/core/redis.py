@@ -1,8 +1,17 @@
 import logging  # для логирования ошибок
+import time
+from urllib.parse import urlsplit
 
-from redis.asyncio import Redis, ConnectionPool
+from redis.asyncio import Redis, BlockingConnectionPool
+from redis.asyncio.client import Pipeline
 
 from app.core.config import settings
+from app.core.metrics import (
+    REDIS_COMMAND_DURATION,
+    REDIS_POOL_IDLE,
+    REDIS_POOL_IN_USE,
+    REDIS_POOL_WAIT,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -24,24 +33,89 @@ def get_redis_client() -> Redis:
     return redis_client
 
 
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    """
+    Пул, который ждет освободившееся соединение (а не падает с
+    «Too many connections», как обычный ConnectionPool) и отдает
+    загрузку и время ожидания в метрики.
+    """
+
+    async def get_connection(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await super().get_connection(*args, **kwargs)
+        finally:
+            REDIS_POOL_WAIT.observe(time.perf_counter() - start)
+            self._report_usage()
+
+    async def release(self, connection):
+        await super().release(connection)
+        self._report_usage()
+
+    def _report_usage(self) -> None:
+        REDIS_POOL_IN_USE.set(len(self._in_use_connections))
+        REDIS_POOL_IDLE.set(len(self._available_connections))
+
+
+class InstrumentedPipeline(Pipeline):
+    """Пакет команд, время которого уходит в метрики как команда PIPELINE"""
+
+    async def execute(self, raise_on_error: bool = True):
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            REDIS_COMMAND_DURATION.labels(command="PIPELINE").observe(
+                time.perf_counter() - start
+            )
+
+
+class InstrumentedRedis(Redis):
+    """Клиент, который отдает в метрики задержку каждой команды"""
+
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            REDIS_COMMAND_DURATION.labels(command=str(args[0]).upper()).observe(
+                time.perf_counter() - start
+            )
+
+    def pipeline(
+        self, transaction: bool = True, shard_hint: str | None = None
+    ) -> InstrumentedPipeline:
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+def redis_cache_url() -> str:
+    """REDIS_URL с номером БД для кеша вместо номера БД брокера"""
+    return urlsplit(settings.REDIS_URL)._replace(
+        path=f"/{settings.REDIS_CACHE_DB}"
+    ).geturl()
+
+
 async def init_redis() -> Redis:
     """
     Создает подключение к Redis.
     Вызывается один раз при старте приложения (в lifespan).
     """
     global redis_client
-    redis_cache_url = settings.REDIS_URL.replace("/0", "/1")
-    logger.info(f"Connecting to Redis cache at {redis_cache_url}")
-
-    #    - ConnectionPool управляет несколькими соединениями
-    #    - from_url создает пул из URL-строки
-    #    - max_connections=10 — максимум одновременных соединений
-    pool = ConnectionPool.from_url(
-        redis_cache_url,
-        max_connections=10,
+    cache_url = redis_cache_url()
+    logger.info(f"Connecting to Redis cache at {cache_url}")
+
+    pool = InstrumentedConnectionPool.from_url(
+        cache_url,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
         decode_responses=False  # Оставляем False, потому что будем хранить JSON
     )
-    redis_client = Redis.from_pool(pool)
+    redis_client = InstrumentedRedis.from_pool(pool)
     try:
         await redis_client.ping()
         logger.info("Successfully connected to Redis and ping successful")
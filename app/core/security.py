@@ -1,18 +1,67 @@
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from pwdlib import PasswordHash
 import jwt
 
+from app.core.cache import LocalCache
 from app.core.config import settings
+from app.core.metrics import (
+    PASSWORD_HASH_DURATION,
+    PASSWORD_HASH_PENDING,
+    PASSWORD_HASH_QUEUE_WAIT,
+)
 
 password_hash = PasswordHash.recommended()
 
+# Argon2 (argon2-cffi) отпускает GIL, поэтому обычного пула потоков
+# достаточно, чтобы хеширование не блокировало event loop.
+# Размер пула — предел одновременных хеширований на воркер,
+# остальные запросы ждут в очереди пула
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
 
-def verify_password(plain_password, hashed_password):
-    return password_hash.verify(plain_password, hashed_password)
+# Проверенные claims токенов: ключ — SHA-256 токена, запись живет до exp
+token_cache = LocalCache(
+    "tokens",
+    maxsize=settings.TOKEN_CACHE_SIZE,
+    ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
 
 
-def get_password_hash(password):
-    return password_hash.hash(password)
+async def _run_in_password_pool(operation: str, func, *args):
+    queued_at = time.perf_counter()
+
+    def job():
+        started_at = time.perf_counter()
+        PASSWORD_HASH_QUEUE_WAIT.observe(started_at - queued_at)
+        try:
+            return func(*args)
+        finally:
+            PASSWORD_HASH_DURATION.labels(operation=operation).observe(
+                time.perf_counter() - started_at
+            )
+
+    PASSWORD_HASH_PENDING.inc()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, job)
+    finally:
+        PASSWORD_HASH_PENDING.dec()
+
+
+async def verify_password(plain_password, hashed_password):
+    return await _run_in_password_pool(
+        "verify", password_hash.verify, plain_password, hashed_password
+    )
+
+
+async def get_password_hash(password):
+    return await _run_in_password_pool("hash", password_hash.hash, password)
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
@@ -27,3 +76,27 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
         settings.SECRET_KEY,
         algorithm=settings.ALGORITHM
     )
+
+
+def decode_access_token(token: str) -> dict:
+    """
+    Проверяет подпись и claims токена, результат запоминается до exp.
+    Повторные запросы с тем же токеном обходятся без jwt.decode.
+    Возвращаемый словарь общий для всех запросов — не изменять.
+    Невалидный токен -> jwt.InvalidTokenError (не кешируется).
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(digest)
+    if payload is not None:
+        return payload
+
+    payload = jwt.decode(
+        token,
+        settings.SECRET_KEY,
+        algorithms=[settings.ALGORITHM]
+    )
+    exp = payload.get("exp")
+    ttl = exp - time.time() if exp is not None else None
+    if ttl is None or ttl > 0:
+        token_cache.set(digest, payload, ttl=ttl)
+    return payload
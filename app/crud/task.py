@@ -1,59 +1,627 @@
-import json
-from datetime import datetime
+import asyncio
+import time
+from collections.abc import AsyncIterator, Sequence
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from operator import attrgetter
 
 from fastapi import Request
 from redis.asyncio import Redis
-from sqlalchemy import select
+from sqlalchemy import (
+    Integer,
+    Row,
+    any_,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    select,
+    true,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import aliased
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.task import Task
-from app.schemas.task import TaskCreate, TaskUpdate, TaskOut
+from app.core.cache import (
+    LocalCache,
+    SingleFlight,
+    batch,
+    cached_get,
+    get_many,
+    publish_invalidation,
+    redis_key_cache,
+    should_refresh_early,
+    track_prefix,
+    tracking_active,
+    try_lock,
+)
+from app.core.config import settings
+from app.core.etag import content_etag, parse_etags
+from app.core.events import TaskEvent, publish_task_event
+from app.core.json import dumps
+from app.core.metrics import CACHE_HITS, CACHE_MISSES
+from app.core.pagination import cursor_datetime, decode_cursor, encode_cursor
+from app.db.session import mark_recent_write, release_connection
+from app.models.task import TASKS_SEARCH_CONFIG, Task, TaskDeletion
+from app.schemas.task import (
+    TaskCreate,
+    TaskUpdate,
+    TaskOut,
+    TaskListAdapter,
+    TaskBatchUpdateItem,
+    TaskFilter,
+)
 
 
-def json_serial(obj):
-    """Сериализатор для JSON, поддерживающий datetime."""
-    if isinstance(obj, datetime):
-        return obj.isoformat()
-    raise TypeError(f"Type {type(obj)} not serializable")
+# Первый уровень кеша списков задач — память воркера.
+# Группа записей — owner_id, сбрасывается при любой записи пользователя
+task_list_cache = LocalCache(
+    "tasks",
+    maxsize=settings.TASKS_LOCAL_CACHE_SIZE,
+    ttl=settings.TASKS_LOCAL_CACHE_TTL,
+)
+# Последнее виденное поколение кеша задач пользователя. Это только
+# догадка: она проверяется тем же MGET, поэтому сбрасывать ее не нужно
+task_generations = LocalCache(
+    "tasks_generations",
+    maxsize=settings.TASKS_LOCAL_CACHE_SIZE,
+    ttl=settings.TASKS_CACHE_TTL,
+)
 
 
-async def invalidate_user_tasks_cache(redis: Redis, owner_id: int):
+class TaskNotFoundError(Exception):
+    """Задачи с такими id не существуют"""
+
+    def __init__(self, task_ids: list[int]):
+        super().__init__(f"Tasks not found: {task_ids}")
+        self.task_ids = task_ids
+
+
+class TaskPermissionError(Exception):
+    """Задачи принадлежат другому пользователю"""
+
+    def __init__(self, task_ids: list[int]):
+        super().__init__(f"Tasks belong to another user: {task_ids}")
+        self.task_ids = task_ids
+
+
+class TaskPreconditionFailedError(Exception):
+    """Задача изменилась: ни один ETag из If-Match не совпал"""
+
+    def __init__(self, task_id: int):
+        super().__init__(f"Task has been modified: {task_id}")
+        self.task_id = task_id
+
+
+class SyncTokenExpiredError(Exception):
+    """Токен синхронизации старше журнала удалений"""
+
+
+# Колонки задачи без search_vector: его считает БД, в ответы он не входит
+_TASK_COLUMNS = [
+    column for column in Task.__table__.c if column.key != "search_vector"
+]
+
+
+def _id_in(task_ids: list[int]):
+    """WHERE id = ANY($1) — один параметр-массив вместо списка IN (...)"""
+    return Task.id == any_(literal(task_ids, ARRAY(Integer)))
+
+
+# Счетчик поколения читается почти на каждый запрос списка,
+# поэтому его можно держать в памяти воркера (см. cached_get)
+TASKS_GENERATION_PREFIX = "tasks:gen:"
+track_prefix(TASKS_GENERATION_PREFIX)
+
+
+def tasks_generation_key(owner_id: int) -> str:
     """
-    Удаляет все кеши задач для указанного пользователя.
+    Ключ счетчика поколений кеша задач пользователя.
+    Номер поколения входит в каждый ключ списка задач, поэтому
+    смена поколения делает недоступными сразу все страницы.
+    Счетчик живет без TTL: при политиках volatile-* Redis его не вытеснит.
     """
-    pattern = f"user:{owner_id}:tasks:*"
-    async for key in redis.scan_iter(pattern):
-        await redis.delete(key)
+    return f"{TASKS_GENERATION_PREFIX}{owner_id}"
 
 
-async def get_tasks(
+def tasks_page_key(owner_id: int, generation: int, page: str) -> str:
+    return f"tasks:page:{owner_id}:{generation}:{page}"
+
+
+async def _read_cached_page(
+    redis: Redis,
+    owner_id: int,
+    page: str,
+) -> tuple[str, bytes | None]:
+    """
+    Ключ страницы текущего поколения и ее содержимое в Redis.
+    Обычно это один round trip: поколение либо уже лежит в памяти
+    (client-side caching), либо читается вместе со страницей одним MGET —
+    страница берется по последнему виденному номеру поколения,
+    и если он устарел, нужен второй запрос.
+    """
+    generation_key = tasks_generation_key(owner_id)
+    if tracking_active():
+        generation = int(await cached_get(redis, generation_key) or 0)
+        cache_key = tasks_page_key(owner_id, generation, page)
+        return cache_key, await redis.get(cache_key)
+
+    guess = task_generations.get(owner_id) or 0
+    raw_generation, cached = await get_many(
+        redis, [generation_key, tasks_page_key(owner_id, guess, page)]
+    )
+    generation = int(raw_generation) if raw_generation else 0
+    task_generations.set(owner_id, generation)
+    cache_key = tasks_page_key(owner_id, generation, page)
+    if generation != guess:
+        cached = await redis.get(cache_key)
+    return cache_key, cached
+
+
+async def invalidate_user_tasks_cache(
+    redis: Redis,
+    owner_id: int,
+    event: TaskEvent | None = None,
+):
+    """
+    Инвалидирует все кеши задач пользователя одной командой INCR.
+    Страницы старого поколения никто больше не читает,
+    они сами удалятся по истечении TTL.
+    Локальные кеши воркеров сбрасываются через pub/sub,
+    свои (страницы и поколение) — сразу.
+    Заодно открывает окно read-your-writes: пока реплика догоняет,
+    чтения пользователя идут на primary, и рассылает event
+    подписанным клиентам пользователя.
+    Все команды уходят в Redis одним пакетом.
+    """
+    async with batch(redis) as pipe:
+        await mark_recent_write(pipe, owner_id)
+        await pipe.incr(tasks_generation_key(owner_id))
+        await publish_invalidation(pipe, task_list_cache, owner_id)
+        if event is not None:
+            await publish_task_event(pipe, owner_id, event)
+    task_list_cache.invalidate_group(owner_id)
+    # уведомление CLIENT TRACKING придет позже — без этого чтение
+    # на этом же воркере взяло бы старое поколение из памяти
+    redis_key_cache.invalidate_group(tasks_generation_key(owner_id))
+
+
+# Поля TaskOut в порядке схемы. JSON списков задач собирается прямо
+# из ORM-объектов: колонки уже нужных типов, а проход через pydantic
+# (validate + dump) стоит в несколько раз дороже самого кодирования
+_TASK_OUT_FIELDS = tuple(TaskOut.model_fields)
+_task_out_values = attrgetter(*_TASK_OUT_FIELDS)
+
+
+def tasks_json(tasks: Sequence[Task | Row]) -> bytes:
+    """JSON-массив TaskOut — байт в байт как TaskListAdapter.dump_json"""
+    return dumps([
+        dict(zip(_TASK_OUT_FIELDS, _task_out_values(task))) for task in tasks
+    ])
+
+
+def tasks_ndjson(tasks: Sequence[Task | Row]) -> bytes:
+    """TaskOut по одному в строке (NDJSON) — для потоковой выгрузки"""
+    return b"".join(
+        dumps(dict(zip(_TASK_OUT_FIELDS, _task_out_values(task)))) + b"\n"
+        for task in tasks
+    )
+
+
+def tasks_event(event_type: str, tasks: Sequence[Task]) -> TaskEvent:
+    """Событие created/updated: JSON-массив TaskOut"""
+    return TaskEvent(event_type, tasks_json(tasks))
+
+
+def deleted_event(task_ids: Sequence[int]) -> TaskEvent:
+    """Событие deleted: JSON-массив id"""
+    return TaskEvent("deleted", dumps(list(task_ids)))
+
+
+@dataclass(frozen=True, slots=True)
+class TaskPage:
+    """
+    Страница задач в готовом к отдаче виде.
+    payload — JSON-массив TaskOut, next_cursor — курсор последней задачи,
+    если страница заполнена (иначе следующей страницы нет).
+    computed_in и expires_at нужны раннему обновлению кеша:
+    сколько секунд страница считалась и когда она устаревает (unix time).
+    """
+    payload: bytes
+    next_cursor: str | None = None
+    computed_in: float = 0.0
+    expires_at: float = 0.0
+
+    def dumps(self) -> bytes:
+        # Формат в кеше: "<next_cursor> <computed_in> <expires_at>\n<payload>" —
+        # курсор в base64 без пробелов, а JSON без переводов строк,
+        # поэтому разделители однозначны
+        header = (
+            f"{self.next_cursor or ''} {self.computed_in:.6f} {self.expires_at:.3f}"
+        )
+        return header.encode() + b"\n" + self.payload
+
+    @property
+    def etag(self) -> str:
+        """
+        ETag страницы — хеш ее содержимого, а не номер поколения:
+        запись в другую часть списка не сбрасывает 304 у этой страницы.
+        Считается по готовому JSON, поэтому 304 не требует ни БД,
+        ни сериализации, если страница есть в кеше.
+        """
+        return content_etag(str(self.next_cursor).encode(), self.payload)
+
+    @classmethod
+    def loads(cls, data: bytes) -> "TaskPage":
+        header, _, payload = data.partition(b"\n")
+        next_cursor, computed_in, expires_at = header.decode().split(" ")
+        return cls(
+            payload=payload,
+            next_cursor=next_cursor or None,
+            computed_in=float(computed_in),
+            expires_at=float(expires_at),
+        )
+
+
+# Одновременные промахи по одной странице в воркере — один запрос к БД
+task_page_flights = SingleFlight()
+
+# Поля сортировки; при равных значениях порядок добирает id,
+# под каждое есть индекс (owner_id, <поле>, id)
+_SORT_COLUMNS = {
+    "id": Task.id,
+    "created_at": Task.created_at,
+    "updated_at": Task.updated_at,
+}
+
+
+def _sort_keys(sort: str) -> tuple[list, bool]:
+    """Колонки ключа сортировки и направление (True — по убыванию)"""
+    field = sort.removeprefix("-")
+    keys = [Task.id] if field == "id" else [_SORT_COLUMNS[field], Task.id]
+    return keys, sort.startswith("-")
+
+
+def task_cursor(sort: str, task: Task) -> str:
+    """Курсор позиции задачи: значение поля сортировки и id"""
+    if sort.removeprefix("-") == "id":
+        return encode_cursor({"id": task.id})
+    value = getattr(task, sort.removeprefix("-"))
+    return encode_cursor({"v": value.isoformat(), "id": task.id})
+
+
+def parse_task_cursor(sort: str, cursor: str) -> tuple:
+    """
+    Позиция из курсора для сортировки sort.
+    Курсор от другой сортировки или испорченный — ValueError
+    """
+    values = decode_cursor(cursor)
+    try:
+        if sort.removeprefix("-") == "id":
+            return (int(values["id"]),)
+        return (cursor_datetime(values["v"]), int(values["id"]))
+    except (KeyError, TypeError) as e:
+        raise ValueError("Malformed cursor") from e
+
+
+def _filter_tasks(query, filters: TaskFilter):
+    if filters.completed is not None:
+        query = query.where(Task.completed == filters.completed)
+    if filters.created_from is not None:
+        query = query.where(Task.created_at >= filters.created_from)
+    if filters.created_to is not None:
+        query = query.where(Task.created_at < filters.created_to)
+    if filters.updated_from is not None:
+        query = query.where(Task.updated_at >= filters.updated_from)
+    if filters.updated_to is not None:
+        query = query.where(Task.updated_at < filters.updated_to)
+    if filters.q is not None:
+        # GIN-индекс по search_vector
+        query = query.where(Task.search_vector.op("@@")(
+            func.websearch_to_tsquery(TASKS_SEARCH_CONFIG, filters.q)
+        ))
+    return query
+
+
+def _position_key(after: tuple | None) -> str:
+    if after is None:
+        return "None"
+    return ",".join(
+        value.isoformat() if isinstance(value, datetime) else str(value)
+        for value in after
+    )
+
+
+async def _load_tasks_page(
+    redis: Redis,
+    db: AsyncSession,
+    cache_key: str,
+    owner_id: int,
+    skip: int,
+    limit: int,
+    after: tuple | None,
+    filters: TaskFilter,
+) -> TaskPage:
+    """Читает страницу из БД и кладет в Redis."""
+    started = time.perf_counter()
+    query = _filter_tasks(select(Task).where(Task.owner_id == owner_id), filters)
+    keys, descending = _sort_keys(filters.sort)
+    if after is not None:
+        # keyset: (поле, id) > (:v, :id) — строковое сравнение идет по индексу
+        position = tuple_(*keys) if len(keys) > 1 else keys[0]
+        bound = tuple_(*after) if len(keys) > 1 else after[0]
+        query = query.where(position < bound if descending else position > bound)
+    result = await db.execute(
+        query
+        .order_by(*(key.desc() if descending else key for key in keys))
+        .offset(skip)
+        .limit(limit)
+    )
+    tasks = result.scalars().all()
+    await release_connection(db)
+    # SAVE CACHE (ORM → JSON bytes за один проход orjson)
+    page = TaskPage(
+        payload=tasks_json(tasks),
+        next_cursor=(
+            task_cursor(filters.sort, tasks[-1])
+            if tasks and len(tasks) == limit else None
+        ),
+        computed_in=time.perf_counter() - started,
+        expires_at=time.time() + settings.TASKS_CACHE_TTL,
+    )
+    await redis.setex(
+        cache_key,
+        settings.TASKS_CACHE_TTL + settings.TASKS_CACHE_STALE_TTL,
+        page.dumps(),
+    )
+    return page
+
+
+async def _wait_for_page(redis: Redis, cache_key: str) -> bytes | None:
+    """Ждет, пока страницу положит в Redis держатель блокировки."""
+    deadline = time.monotonic() + settings.TASKS_CACHE_LOCK_TTL
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+        cached = await redis.get(cache_key)
+        if cached:
+            return cached
+    return None
+
+
+async def get_tasks_page(
     request: Request,
     db: AsyncSession,
     owner_id: int,
     skip: int = 0,
-    limit: int = 100
-) -> list[Task]:
+    limit: int = 100,
+    after: tuple | None = None,
+    filters: TaskFilter = TaskFilter(),
+) -> TaskPage:
+    """
+    Страница задач пользователя, отфильтрованная и упорядоченная по filters.
+    after — позиция последней задачи предыдущей страницы
+    (см. parse_task_cursor, keyset-пагинация): в отличие от OFFSET,
+    стоимость не растет с номером страницы, т.к. запрос идет по индексу
+    (owner_id, <поле сортировки>, id).
+    Фильтр входит в ключи обоих уровней кеша.
+    Оба уровня кеша хранят уже сериализованный JSON,
+    поэтому попадание в кеш не требует ни разбора, ни валидации.
+    Пересчитывает страницу один запрос: в воркере одновременные промахи
+    склеиваются, между воркерами — короткая блокировка в Redis,
+    а незадолго до истечения страницу заранее обновляет случайный запрос,
+    пока остальные отдают текущую.
+    """
+    # L1: память воркера
+    local_key = (owner_id, skip, limit, after, filters)
+    page = task_list_cache.get(local_key)
+    if page is not None:
+        return page
+    local_version = task_list_cache.group_version(owner_id)
+
+    # L2: Redis
     redis = request.app.state.redis
-    cache_key = f"user:{owner_id}:tasks:skip:{skip}:limit:{limit}"
-    cached = await redis.get(cache_key)
+    cache_key, cached = await _read_cached_page(
+        redis,
+        owner_id,
+        f"skip:{skip}:limit:{limit}:after:{_position_key(after)}"
+        f":{filters.cache_key()}",
+    )
+
+    async def load() -> TaskPage:
+        return await _load_tasks_page(
+            redis, db, cache_key, owner_id, skip, limit, after, filters
+        )
+
     # CACHE HIT
     if cached:
-        tasks_data = json.loads(cached)
-        return [TaskOut.model_validate(t) for t in tasks_data]
+        CACHE_HITS.labels(cache=task_list_cache.name, tier="redis").inc()
+        page = TaskPage.loads(cached)
+        refresh = should_refresh_early(
+            page.expires_at,
+            page.computed_in,
+            settings.TASKS_CACHE_EARLY_REFRESH_BETA,
+        ) and await try_lock(redis, cache_key, settings.TASKS_CACHE_LOCK_TTL)
+        if refresh:
+            page = await task_page_flights.do(cache_key, load)
     # CACHE MISS
-    result = await db.execute(
-        select(Task).where(Task.owner_id == owner_id).offset(skip).limit(limit)
+    else:
+        CACHE_MISSES.labels(cache=task_list_cache.name, tier="redis").inc()
+
+        async def load_once() -> TaskPage:
+            if not await try_lock(
+                redis, cache_key, settings.TASKS_CACHE_LOCK_TTL
+            ):
+                # страницу уже считает другой воркер
+                cached = await _wait_for_page(redis, cache_key)
+                if cached:
+                    return TaskPage.loads(cached)
+            return await load()
+
+        page = await task_page_flights.do(cache_key, load_once)
+
+    task_list_cache.set(
+        local_key, page, group=owner_id, version=local_version
     )
-    tasks = result.scalars().all()
-    tasks_out = [TaskOut.model_validate(task) for task in tasks]
-    # SAVE CACHE (Pydantic → dict → JSON)
-    await redis.setex(
-        cache_key,
-        300,
-        json.dumps([t.model_dump() for t in tasks_out], default=json_serial)
+    return page
+
+
+async def get_tasks(
+    request: Request,
+    db: AsyncSession,
+    owner_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after: tuple | None = None,
+    filters: TaskFilter = TaskFilter(),
+) -> list[TaskOut]:
+    """Страница задач в виде объектов — для шаблонов веб-интерфейса."""
+    page = await get_tasks_page(
+        request=request,
+        db=db,
+        owner_id=owner_id,
+        skip=skip,
+        limit=limit,
+        after=after,
+        filters=filters,
     )
+    return TaskListAdapter.validate_json(page.payload)
 
-    return tasks_out
+
+async def stream_tasks(
+    db: AsyncSession,
+    owner_id: int,
+    chunk_size: int = 1000,
+) -> AsyncIterator[Sequence[Row]]:
+    """
+    Все задачи пользователя пачками по chunk_size строк через
+    серверный курсор. Строки — Core Row без ORM identity map,
+    поэтому память не растет с количеством задач.
+    """
+    result = await db.stream(
+        select(*_TASK_COLUMNS)
+        .where(Task.owner_id == owner_id)
+        .order_by(Task.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    async for rows in result.partitions():
+        yield rows
+
+
+@dataclass(frozen=True, slots=True)
+class TaskChangeSet:
+    """
+    Изменения задач после позиции синхронизации.
+    position — (updated_at, id), с которой продолжать;
+    has_more — в ответ вошли не все изменения.
+    """
+    changed: Sequence[Task]
+    deleted: Sequence[int]
+    position: tuple[datetime, int]
+    has_more: bool = False
+
+
+async def get_task_changes(
+    db: AsyncSession,
+    owner_id: int,
+    since: tuple[datetime, int] | None = None,
+    limit: int = 500,
+) -> TaskChangeSet:
+    """
+    Задачи, созданные или измененные после позиции since (по индексу
+    (owner_id, updated_at, id)), и id удаленных с тех пор задач.
+    since=None — полная синхронизация, без tombstones.
+    Первый запрос — часы БД и два EXISTS, так что синхронизация
+    без изменений стоит одну пробу каждого индекса.
+
+    updated_at — время начала транзакции, а видна она после коммита,
+    поэтому итоговая позиция отстает от часов БД
+    на TASKS_SYNC_SAFETY_LAG: изменения из таких транзакций придут
+    в следующий раз. Токен страницы при has_more тоже не заходит
+    за watermark. Часть изменений может прийти повторно —
+    клиент применяет их по id.
+    """
+    changed_after = [Task.owner_id == owner_id]
+    deleted_after = [TaskDeletion.owner_id == owner_id]
+    if since is not None:
+        changed_after.append(
+            tuple_(Task.updated_at, Task.id) > tuple_(*since)
+        )
+        deleted_after.append(TaskDeletion.deleted_at > since[0])
+
+    result = await db.execute(select(
+        func.localtimestamp(),
+        exists().where(*changed_after),
+        exists().where(*deleted_after),
+    ))
+    now, has_changed, has_deleted = result.one()
+    retention = timedelta(days=settings.TASKS_SYNC_RETENTION_DAYS)
+    if since is not None and since[0] < now - retention:
+        await release_connection(db)
+        raise SyncTokenExpiredError()
+    watermark = now - timedelta(seconds=settings.TASKS_SYNC_SAFETY_LAG)
+    position = (
+        (watermark, 0)
+        if since is None or since[0] < watermark
+        else since
+    )
+
+    changed: Sequence[Task] = []
+    has_more = False
+    if has_changed:
+        result = await db.scalars(
+            select(Task)
+            .where(*changed_after)
+            .order_by(Task.updated_at, Task.id)
+            .limit(limit + 1)
+        )
+        changed = result.all()
+        has_more = len(changed) > limit
+        if has_more:
+            # Промежуточный токен не заходит за watermark, иначе
+            # задержанный коммит окажется ниже него и потеряется.
+            # Строки отсортированы по updated_at, так что это то же, что
+            # updated_at <= watermark в запросе. Строки новее watermark
+            # придут только последней страницей
+            changed = [
+                task for task in changed[:limit] if task.updated_at <= watermark
+            ]
+            if changed:
+                position = (changed[-1].updated_at, changed[-1].id)
+                # остальные удаления — вместе со следующей страницей
+                deleted_after.append(TaskDeletion.deleted_at <= position[0])
+            else:
+                # все оставшиеся изменения свежее watermark и
+                # не помещаются в страницу — придут в следующий раз
+                has_more = False
+
+    deleted: Sequence[int] = []
+    if has_deleted and since is not None:
+        result = await db.scalars(
+            select(TaskDeletion.task_id)
+            .where(*deleted_after)
+            .order_by(TaskDeletion.deleted_at, TaskDeletion.id)
+        )
+        deleted = result.all()
+    await release_connection(db)
+    return TaskChangeSet(changed, deleted, position, has_more)
+
+
+async def prune_task_deletions(db: AsyncSession) -> int:
+    """
+    Удаляет tombstones старше TASKS_SYNC_RETENTION_DAYS. Токены
+    старше этого срока get_task_changes и так отклоняет (410),
+    так что эти записи уже никому не нужны. Вызывается по расписанию
+    """
+    retention = timedelta(days=settings.TASKS_SYNC_RETENTION_DAYS)
+    result = await db.execute(
+        delete(TaskDeletion)
+        .where(TaskDeletion.deleted_at < func.localtimestamp() - retention)
+    )
+    await db.commit()
+    return result.rowcount
 
 
 async def get_task(
@@ -61,7 +629,9 @@ async def get_task(
     task_id: int
 ) -> Task | None:
     result = await db.execute(select(Task).where(Task.id == task_id))
-    return result.scalar_one_or_none()
+    task = result.scalar_one_or_none()
+    await release_connection(db)
+    return task
 
 
 async def create_task(
@@ -79,32 +649,293 @@ async def create_task(
     db.add(new_task)
     await db.commit()
     await db.refresh(new_task)
-    await invalidate_user_tasks_cache(redis=redis, owner_id=owner_id)
+    await invalidate_user_tasks_cache(
+        redis=redis, owner_id=owner_id, event=tasks_event("created", [new_task])
+    )
     return new_task
 
 
+def task_etag(task: Task) -> str:
+    """Сильный ETag версии задачи: id и updated_at до микросекунд"""
+    return f'"{task.id}-{task.updated_at:%Y%m%d%H%M%S%f}"'
+
+
+def task_versions(if_match: str, task_id: int) -> list[datetime] | None:
+    """
+    Версии (updated_at) задачи, перечисленные в If-Match.
+    None — "*", подходит любая существующая версия.
+    Чужие, слабые и нечитаемые метки пропускаются: If-Match
+    требует строгого сравнения, и они не совпадут ни с чем.
+    """
+    versions = []
+    for tag in parse_etags(if_match):
+        if tag == "*":
+            return None
+        tag_id, _, version = tag.strip('"').partition("-")
+        if tag_id != str(task_id):
+            continue
+        try:
+            versions.append(datetime.strptime(version, "%Y%m%d%H%M%S%f"))
+        except ValueError:
+            continue
+    return versions
+
+
+def _check_single_write(
+    task_id: int,
+    owner_id: int,
+    target_owner_id: int | None,
+    written: bool,
+    conditional: bool = False,
+) -> None:
+    """
+    Разбирает результат записи в одну задачу:
+    target_owner_id — владелец задачи до записи (None — задачи нет),
+    written — затронула ли запись строку,
+    conditional — запись была только для версий из If-Match.
+    """
+    if written:
+        return
+    if target_owner_id is None:
+        raise TaskNotFoundError([task_id])
+    if target_owner_id == owner_id:
+        if conditional:
+            # версия задачи не совпала с If-Match,
+            # в том числе если ее изменили параллельно
+            raise TaskPreconditionFailedError(task_id)
+        # задачу удалили параллельно между чтением и записью
+        raise TaskNotFoundError([task_id])
+    raise TaskPermissionError([task_id])
+
+
+def _version_in(versions: list[datetime] | None):
+    """Условие If-Match для UPDATE/DELETE: updated_at IN (...)"""
+    if versions is None:
+        return true()
+    return Task.updated_at.in_(versions)
+
+
 async def update_task(
     redis: Redis,
     db: AsyncSession,
-    task: Task,
-    task_in: TaskUpdate
+    task_id: int,
+    owner_id: int,
+    task_in: TaskUpdate,
+    versions: list[datetime] | None = None,
 ) -> Task:
+    """
+    Обновляет задачу одной командой:
+        WITH target AS (SELECT owner_id FROM tasks WHERE id = :id),
+             written AS (UPDATE tasks SET ... WHERE id = :id
+                         AND owner_id = :uid RETURNING *)
+        SELECT target.owner_id, written.* FROM target LEFT JOIN written ON true
+    Нет строк — задачи нет (404), есть target без written — чужая (403).
+    versions — допустимые updated_at из If-Match (None — без условия):
+    они попадают в WHERE, так что проверка и запись атомарны,
+    а своя задача без written — уже изменена (412).
+    """
     update_data = task_in.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(task, field, value)
+    if not update_data:
+        task = await get_task(db=db, task_id=task_id)
+        _check_single_write(
+            task_id,
+            owner_id,
+            task.owner_id if task else None,
+            task is not None
+            and task.owner_id == owner_id
+            and (versions is None or task.updated_at in versions),
+            conditional=versions is not None,
+        )
+        return task
+
+    target = select(Task.owner_id).where(Task.id == task_id).cte("target")
+    written = (
+        update(Task)
+        .where(
+            Task.id == task_id,
+            Task.owner_id == owner_id,
+            _version_in(versions),
+        )
+        .values(update_data)
+        .returning(*_TASK_COLUMNS)
+        .cte("written")
+    )
+    written_task = aliased(Task, written)
+    result = await db.execute(
+        select(target.c.owner_id, written_task)
+        .select_from(target.outerjoin(written, true()))
+        .execution_options(populate_existing=True)
+    )
+    row = result.first()
+    target_owner_id, task = row if row else (None, None)
+    if task is None:
+        await db.rollback()
+        _check_single_write(
+            task_id, owner_id, target_owner_id, False,
+            conditional=versions is not None,
+        )
     await db.commit()
-    await db.refresh(task)
-    invalidate_user_tasks_cache(redis=redis, owner_id=task.owner_id)
+    await invalidate_user_tasks_cache(
+        redis=redis, owner_id=owner_id, event=tasks_event("updated", [task])
+    )
     return task
 
 
 async def delete_task(
     redis: Redis,
     db: AsyncSession,
-    task_id: int
+    task_id: int,
+    owner_id: int,
+    versions: list[datetime] | None = None,
+) -> None:
+    """
+    Удаляет задачу одной командой, по той же схеме, что update_task:
+    DELETE ... WHERE id = :id AND owner_id = :uid RETURNING id, owner_id,
+    запись в журнал удалений из его результата
+    плюс владелец из CTE target, чтобы отличить 404 от 403 и 412.
+    """
+    target = select(Task.owner_id).where(Task.id == task_id).cte("target")
+    deleted = (
+        delete(Task)
+        .where(
+            Task.id == task_id,
+            Task.owner_id == owner_id,
+            _version_in(versions),
+        )
+        .returning(Task.id, Task.owner_id)
+        .cte("deleted")
+    )
+    logged = _log_deletions(deleted).returning(TaskDeletion.owner_id).cte("logged")
+    result = await db.execute(
+        select(target.c.owner_id, logged.c.owner_id)
+        .select_from(target.outerjoin(logged, true()))
+    )
+    row = result.first()
+    target_owner_id, deleted_owner_id = row if row else (None, None)
+    if deleted_owner_id is None:
+        await db.rollback()
+        _check_single_write(
+            task_id, owner_id, target_owner_id, False,
+            conditional=versions is not None,
+        )
+    await db.commit()
+    await invalidate_user_tasks_cache(
+        redis=redis, owner_id=owner_id, event=deleted_event([task_id])
+    )
+
+
+def _log_deletions(deleted):
+    """
+    INSERT INTO task_deletions SELECT id, owner_id FROM deleted —
+    tombstones пишутся в той же команде, что и DELETE
+    """
+    return insert(TaskDeletion).from_select(
+        ["task_id", "owner_id"],
+        select(deleted.c.id, deleted.c.owner_id),
+    )
+
+
+async def check_tasks_owner(
+    db: AsyncSession,
+    task_ids: list[int],
+    owner_id: int
+) -> None:
+    """
+    Проверяет одним запросом, что все задачи существуют и принадлежат
+    пользователю. Строки блокируются до конца транзакции (FOR UPDATE),
+    чтобы результат проверки не устарел к моменту записи.
+    """
+    result = await db.execute(
+        select(Task.id, Task.owner_id).where(_id_in(task_ids)).with_for_update()
+    )
+    owners = dict(result.all())
+    missing = [task_id for task_id in task_ids if task_id not in owners]
+    if missing:
+        await db.rollback()
+        raise TaskNotFoundError(missing)
+    foreign = [task_id for task_id in task_ids if owners[task_id] != owner_id]
+    if foreign:
+        await db.rollback()
+        raise TaskPermissionError(foreign)
+
+
+async def create_tasks(
+    redis: Redis,
+    db: AsyncSession,
+    tasks_in: list[TaskCreate],
+    owner_id: int
+) -> list[Task]:
+    """Пакетное создание: один INSERT ... VALUES (...), (...) RETURNING"""
+    result = await db.scalars(
+        insert(Task).returning(Task, sort_by_parameter_order=True),
+        [{**task_in.model_dump(), "owner_id": owner_id} for task_in in tasks_in],
+    )
+    tasks = result.all()
+    await db.commit()
+    await invalidate_user_tasks_cache(
+        redis=redis, owner_id=owner_id, event=tasks_event("created", tasks)
+    )
+    return tasks
+
+
+async def update_tasks(
+    redis: Redis,
+    db: AsyncSession,
+    items: list[TaskBatchUpdateItem],
+    owner_id: int
+) -> list[Task]:
+    """
+    Пакетное обновление. Задачи с одинаковым набором изменений
+    обновляются одним UPDATE ... WHERE id = ANY(...) RETURNING,
+    так что «отметить 500 задач выполненными» — это один запрос.
+    """
+    task_ids = [item.id for item in items]
+    await check_tasks_owner(db=db, task_ids=task_ids, owner_id=owner_id)
+
+    changes: dict[tuple, list[int]] = {}
+    for item in items:
+        values = item.model_dump(exclude_unset=True, exclude={"id"})
+        changes.setdefault(tuple(sorted(values.items())), []).append(item.id)
+
+    tasks: dict[int, Task] = {}
+    for values, ids in changes.items():
+        if not values:
+            continue
+        result = await db.scalars(
+            update(Task)
+            .where(_id_in(ids), Task.owner_id == owner_id)
+            .values(dict(values))
+            .returning(Task)
+        )
+        tasks.update((task.id, task) for task in result)
+    unchanged = [task_id for task_id in task_ids if task_id not in tasks]
+    if unchanged:
+        result = await db.scalars(select(Task).where(_id_in(unchanged)))
+        tasks.update((task.id, task) for task in result)
+    await db.commit()
+    updated = [tasks[task_id] for task_id in task_ids]
+    await invalidate_user_tasks_cache(
+        redis=redis, owner_id=owner_id, event=tasks_event("updated", updated)
+    )
+    return updated
+
+
+async def delete_tasks(
+    redis: Redis,
+    db: AsyncSession,
+    task_ids: list[int],
+    owner_id: int
 ) -> None:
-    task = await get_task(db=db, task_id=task_id)
-    if task:
-        await db.delete(task)
-        await db.commit()
-        invalidate_user_tasks_cache(redis=redis, owner_id=task.owner_id)
+    task_ids = list(dict.fromkeys(task_ids))
+    await check_tasks_owner(db=db, task_ids=task_ids, owner_id=owner_id)
+    deleted = (
+        delete(Task)
+        .where(_id_in(task_ids), Task.owner_id == owner_id)
+        .returning(Task.id, Task.owner_id)
+        .cte("deleted")
+    )
+    await db.execute(_log_deletions(deleted))
+    await db.commit()
+    await invalidate_user_tasks_cache(
+        redis=redis, owner_id=owner_id, event=deleted_event(task_ids)
+    )
@@ -1,20 +1,92 @@
+from redis.asyncio import Redis
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import LocalCache, batch, publish_invalidation
+from app.core.config import settings
+from app.core.metrics import CACHE_HITS, CACHE_MISSES
+from app.db.session import release_connection
 from app.models.user import User
-from app.schemas.user import UserCreate
+from app.schemas.user import UserCreate, UserPrincipal
 from app.core.security import get_password_hash
 
 
+# Кеш пользователей для зависимостей аутентификации, ключ — email (sub токена)
+user_cache = LocalCache(
+    "users",
+    maxsize=settings.USER_CACHE_SIZE,
+    ttl=settings.USER_CACHE_TTL,
+)
+
+
+def user_cache_key(email: str) -> str:
+    return f"user:principal:{email}"
+
+
 async def get_user_by_email(db: AsyncSession, email: str) -> User | None:
     result = await db.execute(select(User).where(User.email == email))
-    return result.scalar_one_or_none()
+    user = result.scalar_one_or_none()
+    # соединение не нужно на время проверки пароля и ответа
+    await release_connection(db)
+    return user
+
+
+async def get_cached_user_by_email(
+    db: AsyncSession,
+    email: str,
+    redis: Redis | None = None,
+) -> User | None:
+    """
+    Пользователь для аутентификации запроса.
+    Возвращает transient-объект User без хеша пароля: он не привязан
+    ни к одной сессии, поэтому его безопасно делить между запросами.
+    Для проверки пароля нужен get_user_by_email.
+    """
+    user = user_cache.get(email)
+    if user is not None:
+        return user
+    version = user_cache.group_version(email)
+
+    use_redis = redis is not None and settings.USER_CACHE_REDIS
+    if use_redis:
+        cached = await redis.get(user_cache_key(email))
+        if cached:
+            CACHE_HITS.labels(cache=user_cache.name, tier="redis").inc()
+            principal = UserPrincipal.model_validate_json(cached)
+            user = User(**principal.model_dump())
+            user_cache.set(email, user, group=email, version=version)
+            return user
+        CACHE_MISSES.labels(cache=user_cache.name, tier="redis").inc()
+
+    db_user = await get_user_by_email(db=db, email=email)
+    if db_user is None:
+        return None
+    principal = UserPrincipal.model_validate(db_user)
+    user = User(**principal.model_dump())
+    user_cache.set(email, user, group=email, version=version)
+    if use_redis:
+        await redis.setex(
+            user_cache_key(email),
+            max(1, int(settings.USER_CACHE_TTL)),
+            principal.model_dump_json(),
+        )
+    return user
+
+
+async def invalidate_user_cache(redis: Redis, email: str) -> None:
+    """Сбрасывает пользователя во всех кешах — вызывать после изменения users."""
+    async with batch(redis) as pipe:
+        if settings.USER_CACHE_REDIS:
+            # UNLINK освобождает память в фоне, не блокируя Redis
+            await pipe.unlink(user_cache_key(email))
+        await publish_invalidation(pipe, user_cache, email)
+    user_cache.invalidate_group(email)
 
 
 async def create_user(db: AsyncSession, user_in: UserCreate) -> User:
     new_user = User(
         email=user_in.email,
-        hashed_password=get_password_hash(user_in.password)
+        hashed_password=await get_password_hash(user_in.password)
     )
     db.add(new_user)
     await db.commit()
@@ -0,0 +1,54 @@
+"""add tasks owner indexes
+
+Revision ID: 3f1c9a7d2b64
+Revises: 8b39e6ceb0cd
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7d2b64'
+down_revision: Union[str, Sequence[str], None] = '8b39e6ceb0cd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY нельзя выполнять внутри транзакции,
+    # зато таблица tasks не блокируется на запись во время построения
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tasks_owner_id_id',
+            'tasks',
+            ['owner_id', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_tasks_owner_id_updated_at_id',
+            'tasks',
+            ['owner_id', 'updated_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_tasks_owner_id_updated_at_id',
+            table_name='tasks',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_tasks_owner_id_id',
+            table_name='tasks',
+            postgresql_concurrently=True,
+        )
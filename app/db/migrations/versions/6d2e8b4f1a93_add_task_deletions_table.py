@@ -0,0 +1,45 @@
+"""add task deletions table
+
+Revision ID: 6d2e8b4f1a93
+Revises: 3f1c9a7d2b64
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6d2e8b4f1a93'
+down_revision: Union[str, Sequence[str], None] = '3f1c9a7d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('task_deletions',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_task_deletions_owner_id_deleted_at',
+        'task_deletions',
+        ['owner_id', 'deleted_at'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        'ix_task_deletions_owner_id_deleted_at',
+        table_name='task_deletions',
+    )
+    op.drop_table('task_deletions')
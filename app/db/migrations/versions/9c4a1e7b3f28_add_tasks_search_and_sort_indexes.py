@@ -0,0 +1,68 @@
+"""add tasks search and sort indexes
+
+Revision ID: 9c4a1e7b3f28
+Revises: 6d2e8b4f1a93
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4a1e7b3f28'
+down_revision: Union[str, Sequence[str], None] = '6d2e8b4f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Хранимая генерируемая колонка переписывает таблицу
+    # под ACCESS EXCLUSIVE — на больших таблицах нужно окно обслуживания
+    op.add_column('tasks', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            "to_tsvector('russian', "
+            "coalesce(title, '') || ' ' || coalesce(description, ''))",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    # CONCURRENTLY нельзя выполнять внутри транзакции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tasks_search_vector',
+            'tasks',
+            ['search_vector'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_tasks_owner_id_created_at_id',
+            'tasks',
+            ['owner_id', 'created_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_tasks_owner_id_created_at_id',
+            table_name='tasks',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_tasks_search_vector',
+            table_name='tasks',
+            postgresql_concurrently=True,
+        )
+    op.drop_column('tasks', 'search_vector')
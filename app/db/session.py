@@ -1,20 +1,142 @@
+import time
 from typing import AsyncGenerator
+from uuid import uuid4
 
+from redis.asyncio import Redis
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
     async_sessionmaker,
+    AsyncEngine,
     AsyncSession,
 )
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
 
 from app.core.config import settings
+from app.core.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_CHECKOUT_WAIT,
+    DB_POOL_OVERFLOW,
+    DB_QUERY_DURATION,
+    request_stats,
+)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Обычный пул asyncpg-соединений, который дополнительно отдает в метрики
+    время ожидания соединения и текущую загрузку пула.
+    """
+    # метка pool в метриках; движку реплики ее задает _create_engine
+    name = "primary"
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        # engine.dispose() заменяет пул новым — имя переходит к нему
+        pool = super().recreate()
+        pool.name = self.name
+        return pool
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(pool=self.name).observe(
+                time.perf_counter() - start
+            )
+            self._report_usage()
+
+    def _do_return_conn(self, record: ConnectionPoolEntry) -> None:
+        super()._do_return_conn(record)
+        self._report_usage()
+
+    def _report_usage(self) -> None:
+        DB_POOL_CHECKED_OUT.labels(pool=self.name).set(self.checkedout())
+        # overflow() отрицателен, пока пул не заполнен до pool_size
+        DB_POOL_OVERFLOW.labels(pool=self.name).set(max(self.overflow(), 0))
+
+
+def _instrument_queries(engine: AsyncEngine) -> None:
+    """
+    Время каждого запроса к БД — в метрики и в счетчики текущего
+    HTTP-запроса (см. MetricsMiddleware). operation — первое слово
+    запроса: SELECT, INSERT, WITH, ...
+    """
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context,
+                              executemany):
+        # запросы одного соединения идут строго по очереди
+        conn.info["query_started"] = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context,
+                             executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"]
+        operation = statement.lstrip().split(None, 1)[0].upper()
+        DB_QUERY_DURATION.labels(operation=operation).observe(elapsed)
+        stats = request_stats.get()
+        if stats is not None:
+            stats.db_queries += 1
+            stats.db_time += elapsed
+            if stats.profile is not None:
+                stats.profile.record(statement, elapsed)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_lazy_load(orm_execute_state: ORMExecuteState) -> None:
+    """
+    Ленивая загрузка связи (task.owner, user.tasks) в профиль запроса.
+    В async-коде она либо падает с MissingGreenlet, либо (через
+    run_sync) дает отдельный запрос на каждый объект — N+1
+    """
+    stats = request_stats.get()
+    if (
+        stats is not None
+        and stats.profile is not None
+        and orm_execute_state.lazy_loaded_from is not None
+    ):
+        relationship = orm_execute_state.loader_strategy_path[-1]
+        stats.profile.lazy_loads[str(relationship)] += 1
+
+
+def _create_engine(url: str, name: str) -> AsyncEngine:
+    connect_args = {}
+    if settings.DB_PGBOUNCER:
+        # pgbouncer в режиме transaction pooling может выполнить следующий
+        # запрос на другом серверном соединении, поэтому prepared statements
+        # не кешируются, а их имена не должны повторяться
+        connect_args = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+
+    engine = create_async_engine(
+        url=url,
+        echo=settings.ENVIRONMENT == "development",  # умный echo
+        future=True,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+    engine.pool.name = name
+    _instrument_queries(engine)
+    return engine
 
 
-engine = create_async_engine(
-    url=settings.DATABASE_URL,
-    echo=settings.ENVIRONMENT == "development",  # умный echo
-    future=True,
-    pool_size=5,
-    max_overflow=10,
+engine = _create_engine(settings.DATABASE_URL, "primary")
+
+# Без реплики чтения идут в тот же движок
+read_engine = (
+    _create_engine(settings.DATABASE_REPLICA_URL, "replica")
+    if settings.DATABASE_REPLICA_URL
+    else engine
 )
 
 async_session_maker = async_sessionmaker(
@@ -22,7 +144,56 @@ async_session_maker = async_sessionmaker(
     expire_on_commit=False,
 )
 
+read_session_maker = async_sessionmaker(
+    read_engine,
+    expire_on_commit=False,
+)
+
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия на запрос. Соединение из пула она берет только при первом
+    запросе к БД, а CRUD-функции чтения возвращают его через
+    release_connection — не дожидаясь сериализации ответа и шаблонов
+    """
     async with async_session_maker() as session:
         yield session
+
+
+async def get_replica_db() -> AsyncGenerator[AsyncSession, None]:
+    """Сессия только для чтения: реплика, если она настроена"""
+    async with read_session_maker() as session:
+        yield session
+
+
+async def release_connection(db: AsyncSession) -> None:
+    """
+    Завершает транзакцию, открытую одними чтениями, и возвращает соединение
+    в пул. Загруженные объекты остаются доступны (expire_on_commit=False),
+    а следующий запрос сессии возьмет соединение заново.
+    Если в сессии есть несохраненные изменения, ничего не делает
+    """
+    if db.in_transaction() and not (db.new or db.dirty or db.deleted):
+        await db.commit()
+
+
+# Read-your-writes: после записи пользователь какое-то время читает
+# с primary, пока реплика не догонит
+
+def recent_write_key(user_id: int) -> str:
+    return f"user:{user_id}:recent_write"
+
+
+async def mark_recent_write(redis: Redis, user_id: int) -> None:
+    if settings.DATABASE_REPLICA_URL:
+        await redis.set(
+            recent_write_key(user_id),
+            1,
+            ex=settings.READ_YOUR_WRITES_WINDOW,
+        )
+
+
+async def has_recent_write(redis: Redis, user_id: int) -> bool:
+    if not settings.DATABASE_REPLICA_URL:
+        return False
+    return bool(await redis.exists(recent_write_key(user_id)))
@@ -1,11 +1,18 @@
+import asyncio
 import logging
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.redis import init_redis, close_redis
+from app.core.cache import listen_invalidations
+from app.core.events import task_events
+from app.core.json import ORJSONResponse
+from app.core.metrics import make_metrics_app, mark_process_dead
+from app.core.middleware import MetricsMiddleware
+from app.core.security import password_executor
 from app.api.v1.endpoints import auth, users, tasks, web
 
 
@@ -30,8 +37,18 @@ async def lifespan(app: FastAPI):
         logger.error(f"Failed to connect to Redis: {e}")
         logger.error("Application cannot start without Redis. Exiting.")
         raise
+    # слушает инвалидации локального кеша от других воркеров
+    invalidation_listener = asyncio.create_task(
+        listen_invalidations(redis_client)
+    )
+    # раздает события задач подключенным к воркеру клиентам
+    events_listener = asyncio.create_task(task_events.listen(redis_client))
     yield  # при остановке закрывает
     logger.info("🛑 Shutting down application...")
+    for listener in (invalidation_listener, events_listener):
+        listener.cancel()
+        with suppress(asyncio.CancelledError):
+            await listener
     try:
         await close_redis()
         logger.info("Redis connections closed successfully")
@@ -39,6 +56,8 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error while closing Redis: {e}")
 
+    password_executor.shutdown(wait=False, cancel_futures=True)
+    mark_process_dead()
     logger.info("Application shutdown complete")
 
 
@@ -46,17 +65,21 @@ app = FastAPI(
     title="FastAPI Todo",
     description="Todo API with FastAPI, Redis, Celery",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"]
+    allow_origins=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
 app.include_router(users.router, prefix="/api/v1/users", tags=["users"])
 app.include_router(tasks.router, prefix="/api/v1/tasks", tags=["tasks"])
 app.include_router(web.router)
 
+app.mount("/metrics", make_metrics_app())
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
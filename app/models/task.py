@@ -1,14 +1,28 @@
 from datetime import datetime
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import Computed, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
 from app.db.base import Base
 
 
+# Конфигурация полнотекстового поиска: в russian слова латиницей
+# обрабатываются английским стеммером, так что ищутся оба языка.
+# Входит в генерируемую колонку — смена требует миграции
+TASKS_SEARCH_CONFIG = "russian"
+
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # keyset-пагинация: WHERE owner_id = ? AND id > ? ORDER BY id
+        Index("ix_tasks_owner_id_id", "owner_id", "id"),
+        Index("ix_tasks_owner_id_updated_at_id", "owner_id", "updated_at", "id"),
+        Index("ix_tasks_owner_id_created_at_id", "owner_id", "created_at", "id"),
+        # поиск ?q=: WHERE search_vector @@ websearch_to_tsquery(...)
+        Index("ix_tasks_search_vector", "search_vector", postgresql_using="gin"),
+    )
     id: Mapped[int] = mapped_column(
         primary_key=True,
         autoincrement=True
@@ -30,3 +44,41 @@ class Task(Base):
         nullable=False,
     )
     owner: Mapped["User"] = relationship(back_populates="tasks")
+    # Считается самой БД при каждой записи; в ответы не входит,
+    # поэтому не загружается вместе с задачей
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"to_tsvector('{TASKS_SEARCH_CONFIG}', "
+            "coalesce(title, '') || ' ' || coalesce(description, ''))",
+            persisted=True,
+        ),
+        deferred=True,
+    )
+
+
+class TaskDeletion(Base):
+    """
+    Журнал удалений задач (tombstones) для дельта-синхронизации:
+    сама задача удаляется, а клиент по /tasks/changes узнает ее id.
+    Записи старше TASKS_SYNC_RETENTION_DAYS раз в сутки удаляет
+    celery beat (prune_task_deletions) — клиентам с более старым
+    токеном все равно нужна полная синхронизация (410).
+    """
+    __tablename__ = "task_deletions"
+    __table_args__ = (
+        # WHERE owner_id = ? AND deleted_at > ?
+        Index("ix_task_deletions_owner_id_deleted_at", "owner_id", "deleted_at"),
+    )
+    id: Mapped[int] = mapped_column(
+        primary_key=True,
+        autoincrement=True
+    )
+    task_id: Mapped[int] = mapped_column(nullable=False)
+    owner_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id"),
+        nullable=False,
+    )
+    deleted_at: Mapped[datetime] = mapped_column(
+        server_default=func.now()
+    )
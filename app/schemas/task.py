@@ -1,5 +1,8 @@
-from pydantic import BaseModel, ConfigDict
-from datetime import datetime
+import hashlib
+from datetime import datetime, timezone
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, field_validator
 
 
 class TaskBase(BaseModel):
@@ -27,3 +30,102 @@ class TaskOut(TaskBase):
     model_config = ConfigDict(
         from_attributes=True,
     )
+
+
+TaskSort = Literal[
+    "id", "-id", "created_at", "-created_at", "updated_at", "-updated_at"
+]
+
+
+class TaskFilter(BaseModel):
+    """
+    Фильтры и сортировка списка задач (query-параметры GET /tasks).
+    Диапазоны дат полуоткрытые: from включительно, to — нет.
+    q — полнотекстовый поиск по title и description
+    (синтаксис websearch: "точная фраза", -исключить, or).
+    sort — поле сортировки, "-" — по убыванию.
+    """
+    completed: bool | None = None
+    created_from: datetime | None = None
+    created_to: datetime | None = None
+    updated_from: datetime | None = None
+    updated_to: datetime | None = None
+    q: str | None = Field(default=None, min_length=1, max_length=200)
+    sort: TaskSort = "id"
+
+    # frozen — фильтр входит в ключ локального кеша
+    model_config = ConfigDict(frozen=True)
+
+    @field_validator("created_from", "created_to", "updated_from", "updated_to")
+    @classmethod
+    def to_utc(cls, value: datetime | None):
+        # Время в БД хранится без пояса, в UTC
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    def cache_key(self) -> str:
+        """
+        Канонический вид фильтра для ключа кеша. Текст поиска
+        хешируется: ключ остается коротким и без лишних символов
+        """
+        parts = [f"sort:{self.sort}"]
+        for name in (
+            "completed", "created_from", "created_to",
+            "updated_from", "updated_to",
+        ):
+            value = getattr(self, name)
+            if value is not None:
+                value = value.isoformat() if isinstance(value, datetime) else int(value)
+                parts.append(f"{name}:{value}")
+        if self.q is not None:
+            digest = hashlib.blake2b(self.q.encode(), digest_size=8).hexdigest()
+            parts.append(f"q:{digest}")
+        return ":".join(parts)
+
+
+# Максимальное число задач в одном пакетном запросе
+TASK_BATCH_MAX_SIZE = 1000
+
+
+class TaskBatchCreate(BaseModel):
+    items: list[TaskCreate] = Field(min_length=1, max_length=TASK_BATCH_MAX_SIZE)
+
+
+class TaskBatchUpdateItem(TaskUpdate):
+    id: int
+
+
+class TaskBatchUpdate(BaseModel):
+    items: list[TaskBatchUpdateItem] = Field(
+        min_length=1, max_length=TASK_BATCH_MAX_SIZE
+    )
+
+    @field_validator("items")
+    @classmethod
+    def unique_ids(cls, items: list[TaskBatchUpdateItem]):
+        if len({item.id for item in items}) != len(items):
+            raise ValueError("id задач в пакете не должны повторяться")
+        return items
+
+
+class TaskBatchDelete(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=TASK_BATCH_MAX_SIZE)
+
+
+class TaskChanges(BaseModel):
+    """
+    Изменения задач с момента токена: changed — созданные и обновленные
+    (по возрастанию updated_at), deleted — id удаленных.
+    next_token передается в следующий запрос ?since=;
+    has_more — изменений больше, чем limit, нужно запросить еще раз сразу.
+    """
+    changed: list[TaskOut]
+    deleted: list[int]
+    next_token: str
+    has_more: bool = False
+
+
+# Сериализация/валидация списка задач целиком в pydantic-core,
+# без поэлементных вызовов model_validate
+TaskListAdapter = TypeAdapter(list[TaskOut])
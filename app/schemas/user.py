@@ -22,6 +22,19 @@ class UserOut(UserBase):
     )
 
 
+class UserPrincipal(BaseModel):
+    """Данные пользователя, которые хранятся в кеше аутентификации (без хеша пароля)."""
+    id: int
+    email: str
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(
+        from_attributes=True,
+    )
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
@@ -0,0 +1,57 @@
+"""
+Накладные расходы зависимости аутентификации на один запрос
+с кешем проверенных JWT и без него (кеш сбрасывается перед каждым вызовом).
+Пользователь заранее лежит в кеше пользователей, поэтому
+Postgres и Redis не нужны — измеряется только CPU-часть.
+
+    python -m benchmarks.auth_dependency --iterations 20000
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.api.deps import get_current_user_from_token
+from app.core.security import create_access_token, token_cache
+from app.crud.user import user_cache
+from app.models.task import Task  # noqa: F401 — нужен мапперу User.tasks
+from app.models.user import User
+from benchmarks.common import report
+
+
+async def measure(token: str, request, iterations: int, clear_cache: bool) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        if clear_cache:
+            token_cache.clear()
+        await get_current_user_from_token(
+            request=request, db=None, replica_db=None, token=token
+        )
+    return (time.process_time() - start) / iterations
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    email = "bench@example.com"
+    now = datetime.now()
+    user_cache.ttl = 3600
+    user_cache.set(email, User(
+        id=1, email=email, is_active=True, created_at=now, updated_at=now,
+    ))
+    token = create_access_token({"sub": email}, expires_delta=timedelta(hours=1))
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(redis=None)))
+
+    without_cache = await measure(token, request, args.iterations, True)
+    with_cache = await measure(token, request, args.iterations, False)
+    report("auth_dependency", {
+        "without_token_cache_us": without_cache * 1e6,
+        "with_token_cache_us": with_cache * 1e6,
+    })
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+"""
+Нагрузочный тест GET /api/v1/tasks/{id}: SQL-запросы и задержка на запрос
+без кеша пользователей (кеш сбрасывается перед каждым запросом) и с ним.
+
+Нужны Postgres (с примененными миграциями) и Redis из настроек приложения.
+
+    python -m benchmarks.auth_user_cache --requests 500
+"""
+import argparse
+import asyncio
+import uuid
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+
+from app.core.redis import close_redis, init_redis
+from app.core.security import create_access_token
+from app.crud.task import create_task
+from app.crud.user import create_user, user_cache
+from app.db.session import async_session_maker, engine
+from app.main import app
+from app.schemas.task import TaskCreate
+from app.schemas.user import UserCreate
+from benchmarks.common import report, summarize, timer
+
+
+async def run(client: AsyncClient, url: str, headers: dict, requests: int,
+              clear_cache: bool) -> dict:
+    statements = 0
+
+    def count_statement(*args):
+        nonlocal statements
+        statements += 1
+
+    samples: list[float] = []
+    event.listen(engine.sync_engine, "before_cursor_execute", count_statement)
+    try:
+        for _ in range(requests):
+            if clear_cache:
+                user_cache.clear()
+            with timer(samples):
+                response = await client.get(url, headers=headers)
+            response.raise_for_status()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count_statement)
+    return {"queries_per_request": statements / requests, **summarize(samples)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    redis = await init_redis()
+    app.state.redis = redis
+    async with async_session_maker() as db:
+        user = await create_user(db, UserCreate(
+            email=f"bench-{uuid.uuid4()}@example.com", password="benchpass",
+        ))
+        task = await create_task(
+            redis=redis, db=db, task_in=TaskCreate(title="bench"),
+            owner_id=user.id,
+        )
+    headers = {
+        "Authorization": f"Bearer {create_access_token({'sub': user.email})}"
+    }
+    url = f"/api/v1/tasks/{task.id}"
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://bench"
+    ) as client:
+        await client.get(url, headers=headers)  # прогрев
+        without_cache = await run(client, url, headers, args.requests, True)
+        with_cache = await run(client, url, headers, args.requests, False)
+
+    report("auth_user_cache", {
+        "without_cache": without_cache,
+        "with_cache": with_cache,
+    })
+    await close_redis()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
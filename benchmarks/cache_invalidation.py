@@ -0,0 +1,87 @@
+"""
+Сравнение задержки записи для двух схем инвалидации кеша задач:
+  - scan: SCAN user:{id}:tasks:* + DELETE каждого ключа (старая схема)
+  - generation: INCR tasks:gen:{id} (текущая схема)
+
+Нужен локальный Redis. База из --redis-url будет ОЧИЩЕНА (FLUSHDB).
+
+    python -m benchmarks.cache_invalidation --keys 1000000
+"""
+import argparse
+import asyncio
+
+from redis.asyncio import Redis
+
+from app.crud.task import invalidate_user_tasks_cache
+from benchmarks.common import report, summarize, timer
+
+
+OWNER_ID = 1
+
+
+async def fill_keyspace(redis: Redis, total_keys: int, pages_per_user: int):
+    """Заполняет базу страницами кеша множества пользователей."""
+    batch = 10_000
+    for start in range(0, total_keys, batch):
+        async with redis.pipeline(transaction=False) as pipe:
+            for i in range(start, min(start + batch, total_keys)):
+                owner_id = OWNER_ID + 1 + i // pages_per_user
+                page = i % pages_per_user
+                pipe.setex(
+                    f"user:{owner_id}:tasks:skip:{page * 100}:limit:100",
+                    3600,
+                    b"[]",
+                )
+            await pipe.execute()
+
+
+async def fill_owner_pages(redis: Redis, pages: int):
+    async with redis.pipeline(transaction=False) as pipe:
+        for page in range(pages):
+            pipe.setex(
+                f"user:{OWNER_ID}:tasks:skip:{page * 100}:limit:100",
+                3600,
+                b"[]",
+            )
+        await pipe.execute()
+
+
+async def scan_invalidate(redis: Redis, owner_id: int):
+    async for key in redis.scan_iter(f"user:{owner_id}:tasks:*"):
+        await redis.delete(key)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--keys", type=int, default=1_000_000)
+    parser.add_argument("--pages-per-user", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    redis = Redis.from_url(args.redis_url)
+    await redis.flushdb()
+    await fill_keyspace(redis, args.keys, args.pages_per_user)
+
+    scan_samples: list[float] = []
+    for _ in range(args.iterations):
+        await fill_owner_pages(redis, args.pages_per_user)
+        with timer(scan_samples):
+            await scan_invalidate(redis, OWNER_ID)
+
+    generation_samples: list[float] = []
+    for _ in range(args.iterations):
+        with timer(generation_samples):
+            await invalidate_user_tasks_cache(redis, OWNER_ID)
+
+    report("cache_invalidation", {
+        "keyspace": await redis.dbsize(),
+        "scan": summarize(scan_samples),
+        "generation": summarize(generation_samples),
+    })
+    await redis.flushdb()
+    await redis.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
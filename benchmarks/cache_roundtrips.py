@@ -0,0 +1,116 @@
+"""
+Round trip'ы и задержка кеша задач на одну запись и одно чтение:
+  - write/sequential: SET read-your-writes + INCR + PUBLISH по очереди
+    (как было до пакетов)
+  - write/batched: invalidate_user_tasks_cache — все команды одним пакетом
+  - read/sequential: GET поколения, затем GET страницы (как было до MGET)
+  - read/mget: _read_cached_page — поколение и страница одним MGET
+
+Round trip — одна отправка команд в сокет с ожиданием ответа.
+Нужен Redis; база из --redis-url будет ОЧИЩЕНА (FLUSHDB).
+
+    python -m benchmarks.cache_roundtrips --redis-url redis://localhost:6379/15
+"""
+import argparse
+import asyncio
+from collections.abc import Awaitable, Callable
+
+from redis.asyncio import Redis
+from redis.asyncio.connection import AbstractConnection
+
+from app.core.cache import INVALIDATION_CHANNEL
+from app.crud.task import (
+    _read_cached_page,
+    invalidate_user_tasks_cache,
+    task_list_cache,
+    tasks_generation_key,
+    tasks_page_key,
+)
+from app.db.session import mark_recent_write
+from benchmarks.common import report, summarize, timer
+
+
+OWNER_ID = 1
+PAGE = "skip:0:limit:100:after:None"
+
+
+class RoundTripCounter:
+    """Считает отправки в сокет всех соединений Redis."""
+
+    def __init__(self):
+        self.count = 0
+        self._send = AbstractConnection.send_packed_command
+
+        async def send_packed_command(connection, command, *args, **kwargs):
+            self.count += 1
+            return await self._send(connection, command, *args, **kwargs)
+
+        AbstractConnection.send_packed_command = send_packed_command
+
+
+async def sequential_write(redis: Redis, owner_id: int):
+    await mark_recent_write(redis, owner_id)
+    await redis.incr(tasks_generation_key(owner_id))
+    await redis.publish(INVALIDATION_CHANNEL, f"{task_list_cache.name}:{owner_id}")
+
+
+async def sequential_read(redis: Redis, owner_id: int):
+    generation = await redis.get(tasks_generation_key(owner_id))
+    generation = int(generation) if generation else 0
+    await redis.get(tasks_page_key(owner_id, generation, PAGE))
+
+
+async def measure(counter: RoundTripCounter, iterations: int,
+                  operation: Callable[[], Awaitable]) -> dict:
+    await operation()  # прогрев: соединение и догадка о поколении
+    samples: list[float] = []
+    before = counter.count
+    for _ in range(iterations):
+        with timer(samples):
+            await operation()
+    return {
+        "round_trips_per_op": (counter.count - before) / iterations,
+        **summarize(samples),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    redis = Redis.from_url(args.redis_url)
+    await redis.flushdb()
+    await redis.set(tasks_page_key(OWNER_ID, 0, PAGE), b"\n[]")
+    counter = RoundTripCounter()
+
+    results = {
+        "write_sequential": await measure(
+            counter, args.iterations,
+            lambda: sequential_write(redis, OWNER_ID),
+        ),
+        "write_batched": await measure(
+            counter, args.iterations,
+            lambda: invalidate_user_tasks_cache(redis, OWNER_ID),
+        ),
+    }
+    # Чтение при неизменном поколении — обычный случай
+    await redis.set(tasks_page_key(
+        OWNER_ID, int(await redis.get(tasks_generation_key(OWNER_ID))), PAGE
+    ), b"\n[]")
+    results["read_sequential"] = await measure(
+        counter, args.iterations, lambda: sequential_read(redis, OWNER_ID)
+    )
+    results["read_mget"] = await measure(
+        counter, args.iterations,
+        lambda: _read_cached_page(redis, OWNER_ID, PAGE),
+    )
+
+    report("cache_roundtrips", results)
+    await redis.flushdb()
+    await redis.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,46 @@
+"""
+Общие помощники для бенчмарков: статистика по замерам и вывод отчета.
+Бенчмарки запускаются из корня репозитория: python -m benchmarks.<имя>
+с теми же переменными окружения, что и приложение (например, из .env.test).
+"""
+import json
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Перцентиль методом ближайшего ранга."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: list[float]) -> dict:
+    """Сводка по замерам в секундах → миллисекунды."""
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "max_ms": max(samples, default=0.0) * 1000,
+    }
+
+
+@contextmanager
+def timer(samples: list[float]):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        samples.append(time.perf_counter() - start)
+
+
+def report(name: str, results: dict) -> None:
+    """Печатает результат одной строкой JSON — удобно сравнивать между коммитами."""
+    json.dump({"benchmark": name, **results}, sys.stdout)
+    sys.stdout.write("\n")
@@ -0,0 +1,161 @@
+"""
+Пропускная способность одного воркера с маленьким пулом соединений
+(по умолчанию pool_size=5 без overflow) при смешанной нагрузке:
+логины (Argon2 в пуле потоков) и чтение задачи по id.
+Режимы:
+  - hold: сессия держит соединение до конца запроса (поведение до
+    release_connection): логин занимает соединение на все время хеширования
+  - release: CRUD-функции чтения сразу возвращают соединение в пул
+
+Закрытый цикл: --login-clients клиентов логинятся, --concurrency клиентов
+читают задачу, все без пауз; результат — запросов в секунду, задержки
+и время, на которое запрос забирает соединение из пула.
+Нужны Postgres (с примененными миграциями) и Redis из настроек приложения.
+
+    python -m benchmarks.connection_hold --concurrency 50 --login-clients 8
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+# Размер пула читается при импорте app.db.session
+os.environ.setdefault("DB_POOL_SIZE", "5")
+os.environ.setdefault("DB_MAX_OVERFLOW", "0")
+
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.core import security  # noqa: E402
+from app.core.redis import close_redis, init_redis  # noqa: E402
+from app.crud import task as task_crud, user as user_crud  # noqa: E402
+from app.crud.user import create_user  # noqa: E402
+from app.db.session import async_session_maker, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.schemas.user import UserCreate  # noqa: E402
+from benchmarks.common import report, summarize, timer  # noqa: E402
+
+
+async def keep_connection(db) -> None:
+    """Подменяет release_connection в режиме hold."""
+
+
+def track_connection_hold(samples: list[float]) -> None:
+    """Сколько соединение проводит вне пула: от checkout до checkin."""
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def on_checkout(dbapi_connection, record, proxy):
+        record.info["checked_out_at"] = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "checkin")
+    def on_checkin(dbapi_connection, record):
+        start = record.info.pop("checked_out_at", None)
+        if start is not None:
+            samples.append(time.perf_counter() - start)
+
+
+async def login_loop(client: AsyncClient, email: str, password: str,
+                     deadline: float, samples: list[float],
+                     errors: list[int]):
+    while time.perf_counter() < deadline:
+        with timer(samples):
+            response = await client.post(
+                "/api/v1/auth/login",
+                data={"username": email, "password": password},
+            )
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+
+async def read_loop(client: AsyncClient, headers: dict, task_url: str,
+                    deadline: float, samples: list[float],
+                    errors: list[int]):
+    while time.perf_counter() < deadline:
+        with timer(samples):
+            response = await client.get(task_url, headers=headers)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+
+holds: list[float] = []
+
+
+async def run(client: AsyncClient, email: str, password: str, headers: dict,
+              task_url: str, args: argparse.Namespace) -> dict:
+    logins: list[float] = []
+    reads: list[float] = []
+    errors: list[int] = []
+    holds.clear()
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(
+        *(
+            login_loop(client, email, password, deadline, logins, errors)
+            for _ in range(args.login_clients)
+        ),
+        *(
+            read_loop(client, headers, task_url, deadline, reads, errors)
+            for _ in range(args.concurrency)
+        ),
+    )
+    elapsed = time.perf_counter() - start
+    return {
+        "read_rps": len(reads) / elapsed,
+        "login_rps": len(logins) / elapsed,
+        "errors": len(errors),
+        "login": summarize(logins),
+        "read": summarize(reads),
+        "connection_hold": summarize(holds),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=50,
+                        help="клиентов, читающих задачу")
+    parser.add_argument("--login-clients", type=int, default=8,
+                        help="клиентов, которые логинятся")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--modes", nargs="+", choices=["hold", "release"],
+                        default=["hold", "release"])
+    args = parser.parse_args()
+
+    app.state.redis = await init_redis()
+    track_connection_hold(holds)
+    email, password = f"bench-{uuid.uuid4()}@example.com", "benchpass"
+    async with async_session_maker() as db:
+        await create_user(db, UserCreate(email=email, password=password))
+    headers = {
+        "Authorization": f"Bearer {security.create_access_token({'sub': email})}"
+    }
+
+    results = {
+        "pool_size": engine.pool.size(),
+        "concurrency": args.concurrency,
+        "login_clients": args.login_clients,
+    }
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://bench", timeout=None
+    ) as client:
+        response = await client.post(
+            "/api/v1/tasks/", json={"title": "bench"}, headers=headers
+        )
+        task_url = f"/api/v1/tasks/{response.json()['id']}"
+
+        release = task_crud.release_connection
+        for mode in args.modes:
+            patched = keep_connection if mode == "hold" else release
+            task_crud.release_connection = patched
+            user_crud.release_connection = patched
+            results[mode] = await run(
+                client, email, password, headers, task_url, args
+            )
+
+    report("connection_hold", results)
+    await close_redis()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,161 @@
+"""
+Память процесса при выгрузке GET /api/v1/tasks/export.
+Засевает пользователю --rows задач (INSERT ... SELECT generate_series),
+выгружает их через приложение и следит за RSS во время стриминга.
+Если прирост RSS не зависит от --rows, память постоянна.
+С --max-rss-growth-mb прогон завершается с ошибкой, если прирост больше.
+
+Нужны Postgres (с примененными миграциями) и Redis из настроек приложения.
+
+    python -m benchmarks.export_memory --rows 1000000 --format ndjson \\
+        --max-rss-growth-mb 50
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+from sqlalchemy import text
+
+from app.core.redis import close_redis, init_redis
+from app.core.security import create_access_token
+from app.crud.user import create_user
+from app.db.session import async_session_maker, engine
+from app.main import app
+from app.schemas.user import UserCreate
+from benchmarks.common import report
+
+
+def current_rss_mb() -> float:
+    with open("/proc/self/statm") as statm:
+        resident_pages = int(statm.read().split()[1])
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+async def seed(owner_id: int, rows: int) -> None:
+    async with async_session_maker() as db:
+        await db.execute(
+            text(
+                "INSERT INTO tasks (title, description, completed, owner_id) "
+                "SELECT 'Task ' || i, 'Lorem ipsum dolor sit amet', "
+                "i % 2 = 0, :owner_id FROM generate_series(1, :rows) AS i"
+            ),
+            {"owner_id": owner_id, "rows": rows},
+        )
+        await db.commit()
+
+
+async def cleanup(owner_id: int) -> None:
+    async with async_session_maker() as db:
+        await db.execute(
+            text("DELETE FROM tasks WHERE owner_id = :owner_id"),
+            {"owner_id": owner_id},
+        )
+        await db.execute(
+            text("DELETE FROM users WHERE id = :owner_id"),
+            {"owner_id": owner_id},
+        )
+        await db.commit()
+
+
+async def stream_export(query: str, headers: dict) -> tuple[int, float]:
+    """
+    Вызывает ASGI-приложение напрямую и выбрасывает полученные куски:
+    httpx.ASGITransport накапливает все тело ответа в памяти,
+    что исказило бы замер.
+    """
+    received = 0
+    rss_peak = current_rss_mb()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/v1/tasks/export",
+        "raw_path": b"/api/v1/tasks/export",
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [
+            (name.lower().encode(), value.encode())
+            for name, value in headers.items()
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+        "state": {},
+    }
+
+    request_sent = False
+    response_done = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # дальше клиент «молчит», пока ответ не будет отправлен
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal received, rss_peak
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+        elif message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+            rss_peak = max(rss_peak, current_rss_mb())
+            if not message.get("more_body", False):
+                response_done.set()
+
+    await app(scope, receive, send)
+    return received, rss_peak
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--max-rss-growth-mb", type=float,
+                        help="допустимый прирост RSS при выгрузке")
+    args = parser.parse_args()
+
+    app.state.redis = await init_redis()
+    async with async_session_maker() as db:
+        user = await create_user(db, UserCreate(
+            email=f"bench-{uuid.uuid4()}@example.com", password="benchpass",
+        ))
+    await seed(user.id, args.rows)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': user.email})}"}
+
+    try:
+        rss_start = current_rss_mb()
+        start = time.perf_counter()
+        received, rss_peak = await stream_export(
+            f"format={args.format}", headers
+        )
+        elapsed = time.perf_counter() - start
+    finally:
+        await cleanup(user.id)
+
+    report("export_memory", {
+        "rows": args.rows,
+        "format": args.format,
+        "bytes": received,
+        "seconds": elapsed,
+        "rss_start_mb": rss_start,
+        "rss_peak_mb": rss_peak,
+        "rss_growth_mb": rss_peak - rss_start,
+    })
+    await close_redis()
+    await engine.dispose()
+    growth = rss_peak - rss_start
+    if args.max_rss_growth_mb is not None and growth > args.max_rss_growth_mb:
+        raise SystemExit(
+            f"RSS grew by {growth:.1f} MB during export, "
+            f"limit {args.max_rss_growth_mb} MB"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
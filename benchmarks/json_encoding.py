@@ -0,0 +1,107 @@
+"""
+CPU и размер JSON для списка из --size задач:
+  - payload: страница кеша из ORM-объектов при промахе
+      - stdlib: TaskOut.model_validate + json.dumps с хуком для datetime
+      - pydantic: TaskListAdapter.validate_python + dump_json
+      - orjson: tasks_json (текущая схема, app.core.json)
+  - response: тело ответа с response_model после сериализации FastAPI
+      - JSONResponse (stdlib json, прежний класс по умолчанию)
+      - ORJSONResponse (app.core.json, класс по умолчанию)
+
+Postgres и Redis не нужны.
+
+    python -m benchmarks.json_encoding --size 1000 --iterations 200
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+
+from fastapi.responses import JSONResponse
+
+from app.core.json import ORJSONResponse
+from app.crud.task import tasks_json
+from app.models.task import Task
+from app.models.user import User  # noqa: F401 — для relationship Task.owner
+from app.schemas.task import TaskListAdapter, TaskOut
+from benchmarks.common import report
+
+
+def make_tasks(count: int) -> list[Task]:
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return [
+        Task(
+            id=i,
+            title=f"Задача {i}",
+            description="Lorem ipsum dolor sit amet " * 3,
+            completed=i % 2 == 0,
+            created_at=now,
+            updated_at=now,
+            owner_id=1,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def json_serial(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def stdlib_payload(tasks: list[Task]) -> bytes:
+    return json.dumps(
+        [TaskOut.model_validate(task).model_dump() for task in tasks],
+        default=json_serial,
+    ).encode()
+
+
+def pydantic_payload(tasks: list[Task]) -> bytes:
+    return TaskListAdapter.dump_json(
+        TaskListAdapter.validate_python(tasks, from_attributes=True)
+    )
+
+
+def measure(func, arg, iterations: int) -> dict:
+    body = func(arg)
+    start = time.process_time()
+    for _ in range(iterations):
+        func(arg)
+    cpu = (time.process_time() - start) / iterations
+    return {"cpu_ms": cpu * 1000, "bytes": len(body)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    tasks = make_tasks(args.size)
+    # так ответ выглядит после field.serialize в FastAPI: dict/str/int
+    content = TaskListAdapter.dump_python(
+        TaskListAdapter.validate_python(tasks, from_attributes=True),
+        mode="json",
+    )
+
+    results = {
+        "size": args.size,
+        "payload": {
+            "stdlib": measure(stdlib_payload, tasks, args.iterations),
+            "pydantic": measure(pydantic_payload, tasks, args.iterations),
+            "orjson": measure(tasks_json, tasks, args.iterations),
+        },
+        "response": {
+            "json_response": measure(
+                lambda c: JSONResponse(c).body, content, args.iterations
+            ),
+            "orjson_response": measure(
+                lambda c: ORJSONResponse(c).body, content, args.iterations
+            ),
+        },
+    }
+    report("json_encoding", results)
+
+
+if __name__ == "__main__":
+    main()
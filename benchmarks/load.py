@@ -0,0 +1,314 @@
+"""
+Нагрузочный прогон API по сценариям на заранее засеянных данных:
+--users пользователей по --tasks задач у каждого. Сценарии:
+  - login: POST /api/v1/auth/login случайными пользователями
+  - dashboard: опрос первой страницы GET /api/v1/tasks/ с If-None-Match,
+    как открытая вкладка
+  - pagination: проход по списку через X-Next-Cursor на --depth страниц
+    (задержка и отдельно по номеру страницы)
+  - writes: создание задач и PATCH своих задач (доля --update-ratio)
+
+Каждый сценарий идет --duration секунд в --concurrency клиентов.
+Результат: RPS, p50/p95/p99, ошибки, запросы к БД и команды Redis
+(пакет — одна команда) на HTTP-запрос по разнице счетчиков /metrics.
+
+По умолчанию приложение запускается в этом процессе со своим lifespan
+(один воркер без сети, Postgres и Redis из настроек). С --url нагрузка
+идет на запущенный сервер, например `docker compose up app` или
+uvicorn --workers N с PROMETHEUS_MULTIPROC_DIR; данные засеваются
+в БД из настроек, она должна совпадать с БД сервера.
+
+Нужны Postgres (с примененными миграциями) и Redis из настроек приложения.
+
+    python -m benchmarks.load --users 50 --tasks 200 --duration 10 \\
+        --output load.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+
+from httpx import ASGITransport, AsyncClient
+from prometheus_client.parser import text_string_to_metric_families
+from sqlalchemy import text
+
+from app.core.redis import close_redis, init_redis
+from app.core.security import create_access_token
+from app.crud.task import create_tasks
+from app.crud.user import create_user
+from app.db.session import async_session_maker, engine
+from app.main import app
+from app.schemas.task import TaskCreate
+from app.schemas.user import UserCreate
+from benchmarks.common import report, summarize
+
+
+PASSWORD = "benchpass"
+SCENARIOS = ("login", "dashboard", "pagination", "writes")
+# счетчики /metrics, из которых считаются операции на запрос
+OPS_METRICS = {
+    "db_queries": "db_query_duration_seconds",
+    "redis_commands": "redis_command_duration_seconds",
+}
+
+
+@dataclass
+class SeededUser:
+    id: int
+    email: str
+    headers: dict
+    task_ids: list[int]
+    etag: str | None = None  # последний ETag первой страницы (dashboard)
+
+
+@dataclass
+class Recorder:
+    """Задержки и ошибки HTTP-запросов одного сценария"""
+    samples: list[float] = field(default_factory=list)
+    by_tag: dict[str, list[float]] = field(default_factory=dict)
+    errors: int = 0
+
+    async def request(self, client: AsyncClient, method: str, url: str,
+                      tag: str | None = None, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - start
+        self.samples.append(elapsed)
+        if tag is not None:
+            self.by_tag.setdefault(tag, []).append(elapsed)
+        if response.status_code >= 400:
+            self.errors += 1
+        return response
+
+
+Scenario = Callable[
+    [AsyncClient, Recorder, SeededUser, random.Random, argparse.Namespace],
+    Awaitable[None],
+]
+
+
+async def login(client, recorder, user, rng, args):
+    await recorder.request(
+        client, "POST", "/api/v1/auth/login",
+        data={"username": user.email, "password": PASSWORD},
+    )
+
+
+async def dashboard(client, recorder, user, rng, args):
+    headers = dict(user.headers)
+    if user.etag is not None:
+        headers["If-None-Match"] = user.etag
+    response = await recorder.request(
+        client, "GET", "/api/v1/tasks/",
+        params={"limit": args.page_size}, headers=headers,
+    )
+    user.etag = response.headers.get("ETag", user.etag)
+    await asyncio.sleep(args.poll_interval)
+
+
+async def pagination(client, recorder, user, rng, args):
+    params = {"limit": args.page_size}
+    for page in range(1, args.depth + 1):
+        response = await recorder.request(
+            client, "GET", "/api/v1/tasks/", tag=str(page),
+            params=params, headers=user.headers,
+        )
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params = {"limit": args.page_size, "after": cursor}
+
+
+async def writes(client, recorder, user, rng, args):
+    if user.task_ids and rng.random() < args.update_ratio:
+        await recorder.request(
+            client, "PATCH", f"/api/v1/tasks/{rng.choice(user.task_ids)}",
+            json={"completed": rng.random() < 0.5}, headers=user.headers,
+        )
+        return
+    response = await recorder.request(
+        client, "POST", "/api/v1/tasks/",
+        json={"title": f"load {rng.random():.6f}"}, headers=user.headers,
+    )
+    if response.status_code == 201:
+        user.task_ids.append(response.json()["id"])
+
+
+async def scrape_ops(client: AsyncClient) -> dict[str, float]:
+    """Суммы счетчиков операций по всем меткам (и воркерам)"""
+    response = await client.get("/metrics/")
+    totals = dict.fromkeys(OPS_METRICS, 0.0)
+    names = {metric: key for key, metric in OPS_METRICS.items()}
+    for family in text_string_to_metric_families(response.text):
+        key = names.get(family.name)
+        if key is None:
+            continue
+        totals[key] += sum(
+            sample.value for sample in family.samples
+            if sample.name == f"{family.name}_count"
+        )
+    return totals
+
+
+async def run_scenario(client: AsyncClient, scenario: Scenario,
+                       users: list[SeededUser], args) -> dict:
+    recorder = Recorder()
+    ops_before = await scrape_ops(client)
+    deadline = time.perf_counter() + args.duration
+
+    async def worker(number: int):
+        rng = random.Random(f"{args.seed}-{scenario.__name__}-{number}")
+        while time.perf_counter() < deadline:
+            await scenario(client, recorder, rng.choice(users), rng, args)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    ops_after = await scrape_ops(client)
+
+    requests = len(recorder.samples)
+    result = {
+        "requests": requests,
+        "errors": recorder.errors,
+        "rps": requests / elapsed,
+        "latency": summarize(recorder.samples),
+        **{
+            f"{key}_per_request":
+                (ops_after[key] - ops_before[key]) / max(requests, 1)
+            for key in OPS_METRICS
+        },
+    }
+    if recorder.by_tag:
+        result["by_page"] = {
+            tag: summarize(samples) for tag, samples in recorder.by_tag.items()
+        }
+    return result
+
+
+async def seed(redis, users: int, tasks: int, run_id: str) -> list[SeededUser]:
+    seeded = []
+    async with async_session_maker() as db:
+        for number in range(users):
+            email = f"load-{run_id}-{number}@example.com"
+            user = await create_user(
+                db, UserCreate(email=email, password=PASSWORD)
+            )
+            created = []
+            # пачками, чтобы не упереться в лимит параметров запроса
+            for offset in range(0, tasks, 1000):
+                created += await create_tasks(
+                    redis=redis,
+                    db=db,
+                    tasks_in=[
+                        TaskCreate(title=f"task {offset + i}")
+                        for i in range(min(1000, tasks - offset))
+                    ],
+                    owner_id=user.id,
+                )
+            token = create_access_token({"sub": email})
+            seeded.append(SeededUser(
+                id=user.id,
+                email=email,
+                headers={"Authorization": f"Bearer {token}"},
+                task_ids=[task.id for task in created],
+            ))
+    return seeded
+
+
+async def cleanup(user_ids: list[int]) -> None:
+    async with async_session_maker() as db:
+        for table in ("task_deletions", "tasks"):
+            await db.execute(
+                text(f"DELETE FROM {table} WHERE owner_id = ANY(:ids)"),
+                {"ids": user_ids},
+            )
+        await db.execute(
+            text("DELETE FROM users WHERE id = ANY(:ids)"), {"ids": user_ids}
+        )
+        await db.commit()
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--url", help="адрес запущенного сервера")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--tasks", type=int, default=200, help="на пользователя")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS,
+                        default=list(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="секунд на сценарий")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--depth", type=int, default=10,
+                        help="страниц за проход (pagination)")
+    parser.add_argument("--poll-interval", type=float, default=0.0,
+                        help="пауза между опросами (dashboard)")
+    parser.add_argument("--update-ratio", type=float, default=0.5,
+                        help="доля PATCH среди записей (writes)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="дописать результат в файл (JSON)")
+    args = parser.parse_args()
+
+    run_id = uuid.uuid4().hex[:8]
+    async with AsyncExitStack() as stack:
+        if args.url is None:
+            # приложение со своим lifespan, как при запуске uvicorn
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            redis = app.state.redis
+            transport = ASGITransport(app=app)
+            base_url = "http://bench"
+        else:
+            redis = await init_redis()
+            stack.push_async_callback(close_redis)
+            transport = None
+            base_url = args.url
+        stack.push_async_callback(engine.dispose)
+
+        users = await seed(redis, args.users, args.tasks, run_id)
+        stack.push_async_callback(cleanup, [user.id for user in users])
+        client = await stack.enter_async_context(AsyncClient(
+            transport=transport, base_url=base_url, timeout=None
+        ))
+
+        scenarios = {}
+        for name in args.scenarios:
+            scenarios[name] = await run_scenario(
+                client, globals()[name], users, args
+            )
+
+    results = {
+        "commit": git_commit(),
+        "target": args.url or "in-process",
+        "params": {
+            key: value for key, value in vars(args).items()
+            if key not in ("url", "output", "scenarios")
+        },
+        "scenarios": scenarios,
+    }
+    report("load", results)
+    if args.output:
+        with open(args.output, "a") as file:
+            json.dump({"benchmark": "load", **results}, file)
+            file.write("\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
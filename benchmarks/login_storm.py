@@ -0,0 +1,106 @@
+"""
+Задержка посторонних запросов GET /api/v1/tasks во время шквала логинов.
+Все запросы обслуживает одно приложение в одном event loop — как один
+воркер uvicorn. Режимы:
+  - inline: Argon2 выполняется прямо в event loop (поведение до пула)
+  - pool: Argon2 в пуле потоков PASSWORD_HASH_WORKERS
+
+Нужны Postgres (с примененными миграциями) и Redis из настроек приложения.
+
+    python -m benchmarks.login_storm --rate 200 --duration 10
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from concurrent.futures import Executor, Future
+
+from httpx import ASGITransport, AsyncClient
+
+from app.core import security
+from app.core.redis import close_redis, init_redis
+from app.crud.user import create_user
+from app.db.session import async_session_maker, engine
+from app.main import app
+from app.schemas.user import UserCreate
+from benchmarks.common import report, summarize, timer
+
+
+class InlineExecutor(Executor):
+    """Выполняет задачу сразу в вызывающем потоке, т.е. блокирует event loop."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+async def login_storm(client: AsyncClient, email: str, password: str,
+                      rate: int, duration: float) -> int:
+    logins = []
+    interval = 1 / rate
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        logins.append(asyncio.create_task(client.post(
+            "/api/v1/auth/login",
+            data={"username": email, "password": password},
+        )))
+        await asyncio.sleep(interval)
+    await asyncio.gather(*logins)
+    return len(logins)
+
+
+async def poll_tasks(client: AsyncClient, headers: dict,
+                     stop: asyncio.Event) -> list[float]:
+    samples: list[float] = []
+    while not stop.is_set():
+        with timer(samples):
+            await client.get("/api/v1/tasks/", headers=headers)
+        await asyncio.sleep(0.01)
+    return samples
+
+
+async def run(client: AsyncClient, email: str, password: str, headers: dict,
+              rate: int, duration: float) -> dict:
+    stop = asyncio.Event()
+    poller = asyncio.create_task(poll_tasks(client, headers, stop))
+    logins = await login_storm(client, email, password, rate, duration)
+    stop.set()
+    return {"logins": logins, "tasks_latency": summarize(await poller)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rate", type=int, default=200, help="логинов в секунду")
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    app.state.redis = await init_redis()
+    email, password = f"bench-{uuid.uuid4()}@example.com", "benchpass"
+    async with async_session_maker() as db:
+        await create_user(db, UserCreate(email=email, password=password))
+    headers = {
+        "Authorization": f"Bearer {security.create_access_token({'sub': email})}"
+    }
+
+    results = {}
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://bench", timeout=None
+    ) as client:
+        pool = security.password_executor
+        security.password_executor = InlineExecutor()
+        results["inline"] = await run(
+            client, email, password, headers, args.rate, args.duration
+        )
+        security.password_executor = pool
+        results["pool"] = await run(
+            client, email, password, headers, args.rate, args.duration
+        )
+
+    report("login_storm", results)
+    await close_redis()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
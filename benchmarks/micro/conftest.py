@@ -0,0 +1,37 @@
+"""
+Микробенчмарки горячих путей (pytest-benchmark). Postgres и Redis
+не нужны: задачи — несохраненные ORM-объекты, токены — в памяти.
+
+    python -m pytest benchmarks/micro
+    python -m pytest benchmarks/micro --benchmark-autosave
+    python -m pytest benchmarks/micro --benchmark-compare
+
+Сохраненные прогоны лежат в .benchmarks/ и сравниваются между коммитами.
+"""
+from datetime import datetime, timezone
+
+import pytest
+
+from app.models.task import Task
+from app.models.user import User  # noqa: F401 — для relationship Task.owner
+
+
+# Размеры списка: одна задача, страница по умолчанию, большая выгрузка
+SIZES = [1, 100, 1000]
+
+
+@pytest.fixture(params=SIZES, ids=lambda size: f"{size}_tasks")
+def orm_tasks(request) -> list[Task]:
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return [
+        Task(
+            id=i,
+            title=f"Task {i}",
+            description="Lorem ipsum dolor sit amet " * 3,
+            completed=i % 2 == 0,
+            created_at=now,
+            updated_at=now,
+            owner_id=1,
+        )
+        for i in range(1, request.param + 1)
+    ]
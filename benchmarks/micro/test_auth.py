@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+import jwt
+import pytest
+
+from app.core.config import settings
+from app.core.security import (
+    create_access_token,
+    decode_access_token,
+    token_cache,
+)
+
+
+@pytest.fixture
+def token() -> str:
+    return create_access_token(
+        {"sub": "bench@example.com"}, timedelta(minutes=30)
+    )
+
+
+def test_create_access_token(benchmark):
+    benchmark(create_access_token, {"sub": "bench@example.com"})
+
+
+def test_jwt_decode(benchmark, token):
+    """Проверка подписи и claims — промах кеша токенов"""
+    benchmark(
+        jwt.decode, token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+    )
+
+
+def test_decode_access_token_cached(benchmark, token):
+    decode_access_token(token)
+    benchmark(decode_access_token, token)
+
+
+def test_decode_access_token_miss(benchmark, token):
+    def decode():
+        token_cache.clear()
+        return decode_access_token(token)
+
+    benchmark(decode)
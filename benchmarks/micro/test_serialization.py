@@ -0,0 +1,61 @@
+import json
+from datetime import datetime
+
+from fastapi.responses import JSONResponse
+
+from app.core.json import ORJSONResponse
+from app.crud.task import tasks_json
+from app.schemas.task import TaskListAdapter, TaskOut
+
+
+def json_serial(obj):
+    """Хук stdlib json для datetime — как было в get_tasks до pydantic-core"""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def test_model_validate(benchmark, orm_tasks):
+    benchmark(lambda: [TaskOut.model_validate(task) for task in orm_tasks])
+
+
+def test_adapter_validate(benchmark, orm_tasks):
+    benchmark(TaskListAdapter.validate_python, orm_tasks, from_attributes=True)
+
+
+def test_json_dumps(benchmark, orm_tasks):
+    tasks = [TaskOut.model_validate(task).model_dump() for task in orm_tasks]
+    benchmark(json.dumps, tasks, default=json_serial)
+
+
+def test_adapter_dump_json(benchmark, orm_tasks):
+    tasks = TaskListAdapter.validate_python(orm_tasks, from_attributes=True)
+    benchmark(TaskListAdapter.dump_json, tasks)
+
+
+def test_pydantic_payload(benchmark, orm_tasks):
+    """ORM → TaskOut → JSON, прежний путь промаха кеша"""
+    benchmark(lambda: TaskListAdapter.dump_json(
+        TaskListAdapter.validate_python(orm_tasks, from_attributes=True)
+    ))
+
+
+def test_cache_payload(benchmark, orm_tasks):
+    """Путь промаха кеша в _load_tasks_page: ORM → JSON"""
+    benchmark(tasks_json, orm_tasks)
+
+
+def test_json_response_render(benchmark, orm_tasks):
+    content = TaskListAdapter.dump_python(
+        TaskListAdapter.validate_python(orm_tasks, from_attributes=True),
+        mode="json",
+    )
+    benchmark(JSONResponse, content)
+
+
+def test_orjson_response_render(benchmark, orm_tasks):
+    content = TaskListAdapter.dump_python(
+        TaskListAdapter.validate_python(orm_tasks, from_attributes=True),
+        mode="json",
+    )
+    benchmark(ORJSONResponse, content)
@@ -0,0 +1,161 @@
+"""
+Память и ресурсы воркера при --connections простаивающих
+подключениях к GET /api/v1/tasks/stream (SSE) от --users пользователей.
+Подключения проходят через все приложение, включая аутентификацию.
+После подключения всех клиентов одно событие публикуется в Redis
+и замеряется, за сколько его получат все подключения пользователя.
+Результат — прирост RSS на подключение и занятые соединения
+с БД и Redis (ожидается 0 и одно соединение подписчика).
+
+Нужны Postgres (с примененными миграциями) и Redis из настроек приложения.
+
+    python -m benchmarks.sse_connections --connections 10000 --users 100
+"""
+import argparse
+import asyncio
+import gc
+import time
+import uuid
+
+from sqlalchemy import text
+
+from app.core.events import TaskEvent, publish_task_event, task_events
+from app.core.redis import close_redis, init_redis
+from app.core.security import create_access_token
+from app.crud.user import create_user
+from app.db.session import async_session_maker, engine
+from app.main import app
+from app.schemas.user import UserCreate
+from benchmarks.common import report, summarize
+from benchmarks.export_memory import current_rss_mb
+
+
+class Stream:
+    """Одно SSE-подключение через прямой вызов ASGI-приложения."""
+
+    def __init__(self, headers: dict):
+        self.headers = headers
+        self.connected = asyncio.Event()
+        self.received = asyncio.Event()
+        self.received_at = 0.0
+        self.disconnected = asyncio.Event()
+
+    def scope(self) -> dict:
+        return {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/api/v1/tasks/stream",
+            "raw_path": b"/api/v1/tasks/stream",
+            "query_string": b"",
+            "root_path": "",
+            "headers": [
+                (name.lower().encode(), value.encode())
+                for name, value in self.headers.items()
+            ],
+            "client": ("127.0.0.1", 0),
+            "server": ("bench", 80),
+            "state": {},
+        }
+
+    async def receive(self):
+        await self.disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+        elif message["type"] == "http.response.body":
+            if not self.connected.is_set():
+                self.connected.set()
+            elif message["body"].startswith(b"event: "):
+                self.received_at = time.perf_counter()
+                self.received.set()
+
+    async def run(self):
+        await app(self.scope(), self.receive, self.send)
+
+
+async def create_users(count: int) -> list:
+    users = []
+    async with async_session_maker() as db:
+        for _ in range(count):
+            users.append(await create_user(db, UserCreate(
+                email=f"bench-{uuid.uuid4()}@example.com", password="benchpass",
+            )))
+    return users
+
+
+async def cleanup(user_ids: list[int]) -> None:
+    async with async_session_maker() as db:
+        await db.execute(
+            text("DELETE FROM users WHERE id = ANY(:ids)"), {"ids": user_ids}
+        )
+        await db.commit()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--connections", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+
+    redis = app.state.redis = await init_redis()
+    listener = asyncio.create_task(task_events.listen(redis))
+    users = await create_users(args.users)
+    headers = [
+        {"Authorization": f"Bearer {create_access_token({'sub': user.email})}"}
+        for user in users
+    ]
+
+    try:
+        gc.collect()
+        rss_start = current_rss_mb()
+        streams = [
+            Stream(headers[i % args.users]) for i in range(args.connections)
+        ]
+        start = time.perf_counter()
+        tasks = [asyncio.create_task(stream.run()) for stream in streams]
+        await asyncio.gather(*(stream.connected.wait() for stream in streams))
+        connect_seconds = time.perf_counter() - start
+        await asyncio.sleep(1)
+        gc.collect()
+        rss_connected = current_rss_mb()
+
+        # все подключения первого пользователя
+        targets = streams[::args.users]
+        published_at = time.perf_counter()
+        await publish_task_event(redis, users[0].id, TaskEvent("deleted", b"[0]"))
+        await asyncio.gather(*(stream.received.wait() for stream in targets))
+        fanout = [stream.received_at - published_at for stream in targets]
+
+        results = {
+            "connections": args.connections,
+            "users": args.users,
+            "connect_seconds": connect_seconds,
+            "rss_start_mb": rss_start,
+            "rss_connected_mb": rss_connected,
+            "rss_per_connection_kb":
+                (rss_connected - rss_start) * 1024 / args.connections,
+            "db_connections_checked_out": engine.pool.checkedout(),
+            "redis_connections_in_use":
+                len(redis.connection_pool._in_use_connections),
+            "fanout": summarize(fanout),
+        }
+
+        for stream in streams:
+            stream.disconnected.set()
+        await asyncio.gather(*tasks)
+    finally:
+        await cleanup([user.id for user in users])
+
+    report("sse_connections", results)
+    listener.cancel()
+    await close_redis()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
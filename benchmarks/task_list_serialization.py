@@ -0,0 +1,78 @@
+"""
+CPU на один запрос GET /api/v1/tasks при попадании в кеш:
+  - before: json.loads + TaskOut.model_validate на каждую задачу,
+    затем повторная сериализация через response_model (как делает FastAPI)
+  - after: готовые байты из кеша отдаются в Response без обработки
+
+Postgres и Redis не нужны.
+
+    python -m benchmarks.task_list_serialization --sizes 100 1000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from app.crud.task import TaskPage
+from app.schemas.task import TaskListAdapter, TaskOut
+from benchmarks.common import report
+
+
+def make_tasks(count: int) -> list[TaskOut]:
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return [
+        TaskOut(
+            id=i,
+            title=f"Task {i}",
+            description="Lorem ipsum dolor sit amet " * 3,
+            completed=i % 2 == 0,
+            created_at=now,
+            updated_at=now,
+            owner_id=1,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def before(cached: bytes) -> bytes:
+    payload = TaskPage.loads(cached).payload
+    tasks = [TaskOut.model_validate(t) for t in json.loads(payload)]
+    content = TaskListAdapter.validate_python(tasks)
+    return json.dumps(jsonable_encoder(content)).encode()
+
+
+def after(cached: bytes) -> bytes:
+    page = TaskPage.loads(cached)
+    return Response(content=page.payload, media_type="application/json").body
+
+
+def cpu_per_call(func, arg, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        func(arg)
+    return (time.process_time() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        tasks = make_tasks(size)
+        cached = TaskPage(payload=TaskListAdapter.dump_json(tasks)).dumps()
+        results[str(size)] = {
+            "before_us": cpu_per_call(before, cached, args.iterations) * 1e6,
+            "after_us": cpu_per_call(after, cached, args.iterations) * 1e6,
+            "payload_bytes": len(cached),
+        }
+    report("task_list_serialization", results)
+
+
+if __name__ == "__main__":
+    main()
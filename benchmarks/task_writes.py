@@ -0,0 +1,119 @@
+"""
+Записей в секунду на один воркер для PATCH/DELETE задачи:
+  - fetch_then_write: SELECT + проверка владельца в Python,
+    затем commit + refresh (схема до перехода на RETURNING)
+  - returning: один UPDATE/DELETE ... RETURNING с проверкой владельца в SQL
+
+Нужны Postgres (с примененными миграциями) и Redis из настроек приложения.
+
+    python -m benchmarks.task_writes --tasks 2000 --concurrency 10
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from app.core.redis import close_redis, init_redis
+from app.crud.task import (
+    create_tasks,
+    delete_task,
+    get_task,
+    invalidate_user_tasks_cache,
+    update_task,
+)
+from app.crud.user import create_user
+from app.db.session import async_session_maker, engine
+from app.schemas.task import TaskCreate, TaskUpdate
+from app.schemas.user import UserCreate
+from benchmarks.common import report
+
+
+async def legacy_update(redis, db, task_id, owner_id, task_in):
+    task = await get_task(db, task_id)
+    assert task is not None and task.owner_id == owner_id
+    for field, value in task_in.model_dump(exclude_unset=True).items():
+        setattr(task, field, value)
+    await db.commit()
+    await db.refresh(task)
+    await invalidate_user_tasks_cache(redis=redis, owner_id=owner_id)
+
+
+async def legacy_delete(redis, db, task_id, owner_id):
+    task = await get_task(db, task_id)
+    assert task is not None and task.owner_id == owner_id
+    task = await get_task(db, task_id)
+    await db.delete(task)
+    await db.commit()
+    await invalidate_user_tasks_cache(redis=redis, owner_id=owner_id)
+
+
+async def returning_update(redis, db, task_id, owner_id, task_in):
+    await update_task(
+        redis=redis, db=db, task_id=task_id, owner_id=owner_id, task_in=task_in
+    )
+
+
+async def returning_delete(redis, db, task_id, owner_id):
+    await delete_task(redis=redis, db=db, task_id=task_id, owner_id=owner_id)
+
+
+async def seed(redis, owner_id: int, count: int) -> list[int]:
+    async with async_session_maker() as db:
+        tasks = await create_tasks(
+            redis=redis,
+            db=db,
+            tasks_in=[TaskCreate(title=f"bench {i}") for i in range(count)],
+            owner_id=owner_id,
+        )
+    return [task.id for task in tasks]
+
+
+async def writes_per_second(operation, redis, owner_id, task_ids, concurrency,
+                            *args) -> float:
+    queue = list(task_ids)
+
+    async def worker():
+        async with async_session_maker() as db:
+            while queue:
+                await operation(redis, db, queue.pop(), owner_id, *args)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return len(task_ids) / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    redis = await init_redis()
+    async with async_session_maker() as db:
+        user = await create_user(db, UserCreate(
+            email=f"bench-{uuid.uuid4()}@example.com", password="benchpass",
+        ))
+    task_in = TaskUpdate(completed=True)
+
+    results = {}
+    for name, update, delete in (
+        ("fetch_then_write", legacy_update, legacy_delete),
+        ("returning", returning_update, returning_delete),
+    ):
+        task_ids = await seed(redis, user.id, args.tasks)
+        results[name] = {
+            "update_per_sec": await writes_per_second(
+                update, redis, user.id, task_ids, args.concurrency, task_in
+            ),
+            "delete_per_sec": await writes_per_second(
+                delete, redis, user.id, task_ids, args.concurrency
+            ),
+        }
+
+    report("task_writes", results)
+    await close_redis()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,7 +2,7 @@ import pytest
 from typing import AsyncGenerator
 from httpx import ASGITransport, AsyncClient
 import asyncio
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 import uuid
 import sys
 
@@ -16,7 +16,7 @@ from sqlalchemy.ext.asyncio import (
 
 from app.core.config import settings
 from app.db.base import Base
-from app.db.session import get_db
+from app.db.session import _instrument_queries, get_db, get_replica_db
 from app.main import app
 
 
@@ -33,6 +33,8 @@ async def test_engine() -> AsyncGenerator[AsyncEngine, None]:
         echo=True,
         poolclass=NullPool,
     )
+    # метрики и профиль запросов, как у движка приложения
+    _instrument_queries(engine)
     try:
         yield engine
     finally:
@@ -87,10 +89,17 @@ async def client(session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
     # Мок для Redis
     mock_redis = AsyncMock()
     mock_redis.get.return_value = None
+    mock_redis.mget.return_value = [None, None]
     mock_redis.setex.return_value = None
+    # redis.pipeline() — синхронный вызов, команды пакета пишутся в mock_pipeline
+    mock_pipeline = AsyncMock()
+    mock_pipeline.__aenter__.return_value = mock_pipeline
+    mock_redis.pipeline = MagicMock(return_value=mock_pipeline)
     app.state.redis = mock_redis
 
     app.dependency_overrides[get_db] = override_get_db
+    # Одна база выступает и primary, и репликой
+    app.dependency_overrides[get_replica_db] = override_get_db
 
     try:
         async with AsyncClient(
@@ -0,0 +1,77 @@
+"""
+Плагин pytest: бюджет запросов к БД на запрос к эндпоинту.
+
+    @pytest.mark.query_budget(2, endpoint="GET /api/v1/tasks/{task_id}")
+    async def test_read_task(client, test_user): ...
+
+Тест падает, если хоть один запрос к эндпоинту во время теста
+(фикстуры не в счет) выполнил больше запросов к БД. Без endpoint
+бюджет действует на все запросы теста. Ленивые загрузки связей
+всегда превышают бюджет: в async-коде это ошибка или N+1.
+"""
+import pytest
+
+from app.core.profiling import QueryProfile, profile_listeners
+
+
+class QueryBudget:
+    def __init__(self, max_queries: int, endpoint: str | None = None):
+        self.max_queries = max_queries
+        self.endpoint = endpoint
+        self.checked = 0
+        self.violations: list[str] = []
+
+    def check(self, method: str, route: str, profile: QueryProfile) -> None:
+        endpoint = f"{method} {route}"
+        if self.endpoint is not None and endpoint != self.endpoint:
+            return
+        self.checked += 1
+        if profile.queries <= self.max_queries and not profile.lazy_loads:
+            return
+        lines = [
+            f"{endpoint}: {profile.queries} queries "
+            f"(budget {self.max_queries})"
+        ]
+        lines += [
+            f"  {count}x {statement}"
+            for statement, count in profile.statements.items()
+        ]
+        lines += [
+            f"  lazy load {relationship} x{count}"
+            for relationship, count in profile.lazy_loads.items()
+        ]
+        self.violations.append("\n".join(lines))
+
+
+def pytest_configure(config: pytest.Config):
+    config.addinivalue_line(
+        "markers",
+        "query_budget(max_queries, endpoint=None): "
+        "максимум запросов к БД на один запрос к эндпоинту",
+    )
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item: pytest.Item):
+    marker = item.get_closest_marker("query_budget")
+    if marker is None:
+        return (yield)
+
+    # плагин загружается раньше, чем pytest-dotenv прочитает .env.test
+    from app.core.config import settings
+
+    budget = QueryBudget(*marker.args, **marker.kwargs)
+    profiling = settings.DB_QUERY_PROFILING
+    settings.DB_QUERY_PROFILING = True
+    profile_listeners.append(budget.check)
+    try:
+        result = yield
+    finally:
+        profile_listeners.remove(budget.check)
+        settings.DB_QUERY_PROFILING = profiling
+
+    if budget.violations:
+        pytest.fail("Query budget exceeded:\n" + "\n".join(budget.violations))
+    if budget.endpoint is not None and not budget.checked:
+        pytest.fail(f"No requests to {budget.endpoint} during the test")
+    return result
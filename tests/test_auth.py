@@ -2,6 +2,7 @@ import uuid
 import pytest
 import asyncio
 from httpx import AsyncClient
+from sqlalchemy import event
 
 
 @pytest.mark.asyncio
@@ -93,3 +94,37 @@ async def test_login_with_wrong_email(client: AsyncClient, test_user):
     assert response.status_code == 401
     data = response.json()
     assert "detail" in data
+
+
+@pytest.mark.asyncio
+async def test_current_user_is_cached(client: AsyncClient, test_user, test_engine):
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    await client.get('/api/v1/users/me', headers=test_user["headers"])
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", count_statement)
+    try:
+        response = await client.get('/api/v1/users/me', headers=test_user["headers"])
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", count_statement)
+
+    assert response.status_code == 200
+    assert response.json()["email"] == test_user["email"]
+    assert statements == []
+
+
+@pytest.mark.asyncio
+async def test_tampered_token_rejected(client: AsyncClient, test_user):
+    # валидный токен уже в кеше проверенных токенов
+    await client.get('/api/v1/users/me', headers=test_user["headers"])
+
+    tampered = test_user["token"][:-2] + ("AA" if test_user["token"][-2:] != "AA" else "BB")
+    response = await client.get(
+        '/api/v1/users/me',
+        headers={"Authorization": f"Bearer {tampered}"}
+    )
+
+    assert response.status_code == 401
@@ -0,0 +1,180 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.core import cache as cache_module
+from app.core.cache import (
+    LocalCache,
+    SingleFlight,
+    cached_get,
+    _handle_key_invalidation,
+    redis_key_cache,
+    should_refresh_early,
+)
+from app.crud.task import (
+    _read_cached_page,
+    invalidate_user_tasks_cache,
+    tasks_page_key,
+)
+
+
+def test_local_cache_lru_eviction():
+    cache = LocalCache("test_lru", maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "a" становится самым свежим
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_local_cache_ttl_expiry():
+    cache = LocalCache("test_ttl", maxsize=10, ttl=60)
+    cache.set("a", 1, ttl=0)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_local_cache_invalidate_group():
+    cache = LocalCache("test_group", maxsize=10, ttl=60)
+    cache.set((1, "page0"), "x", group=1)
+    cache.set((1, "page1"), "y", group=1)
+    cache.set((2, "page0"), "z", group=2)
+
+    cache.invalidate_group(1)
+
+    assert cache.get((1, "page0")) is None
+    assert cache.get((1, "page1")) is None
+    assert cache.get((2, "page0")) == "z"
+
+
+def test_local_cache_rejects_value_loaded_before_invalidation():
+    cache = LocalCache("test_version", maxsize=10, ttl=60)
+    version = cache.group_version(1)
+    cache.invalidate_group(1)  # запись произошла, пока значение загружалось
+
+    cache.set((1, "page0"), "stale", group=1, version=version)
+
+    assert cache.get((1, "page0")) is None
+
+
+@pytest.mark.asyncio
+async def test_cached_get_serves_tracked_key_from_memory(monkeypatch):
+    monkeypatch.setattr(cache_module, "_tracking_active", True)
+    redis_key_cache.clear()
+    redis = AsyncMock()
+    redis.get.return_value = b"3"
+
+    assert await cached_get(redis, "tasks:gen:1") == b"3"
+    assert await cached_get(redis, "tasks:gen:1") == b"3"
+    assert redis.get.await_count == 1
+
+    # Redis прислал в TRACKING_CHANNEL, что ключ изменился
+    _handle_key_invalidation([b"tasks:gen:1"])
+    redis.get.return_value = b"4"
+    assert await cached_get(redis, "tasks:gen:1") == b"4"
+    assert redis.get.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_get_caches_missing_key(monkeypatch):
+    monkeypatch.setattr(cache_module, "_tracking_active", True)
+    redis_key_cache.clear()
+    redis = AsyncMock()
+    redis.get.return_value = None
+
+    assert await cached_get(redis, "tasks:gen:2") is None
+    assert await cached_get(redis, "tasks:gen:2") is None
+    assert redis.get.await_count == 1
+
+    _handle_key_invalidation(None)  # FLUSHDB
+    assert len(redis_key_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_write_drops_own_cached_generation(monkeypatch):
+    monkeypatch.setattr(cache_module, "_tracking_active", True)
+    redis_key_cache.clear()
+    redis = AsyncMock()
+    redis.pipeline = MagicMock(return_value=AsyncMock())
+    redis.pipeline.return_value.__aenter__.return_value = (
+        redis.pipeline.return_value
+    )
+    values = {"tasks:gen:5": b"3"}
+    redis.get.side_effect = values.get
+    cache_key, _ = await _read_cached_page(redis, 5, "page")
+    assert cache_key == tasks_page_key(5, 3, "page")
+
+    # запись (INCR в пакете), уведомление из TRACKING_CHANNEL еще не пришло
+    await invalidate_user_tasks_cache(redis, 5)
+    values["tasks:gen:5"] = b"4"
+
+    cache_key, _ = await _read_cached_page(redis, 5, "page")
+    assert cache_key == tasks_page_key(5, 4, "page")
+
+
+@pytest.mark.asyncio
+async def test_cached_get_without_tracking_always_reads_redis():
+    redis = AsyncMock()
+    redis.get.return_value = b"1"
+
+    await cached_get(redis, "tasks:gen:3")
+    await cached_get(redis, "tasks:gen:3")
+
+    assert redis.get.await_count == 2
+
+
+def test_should_refresh_early():
+    now = time.time()
+    assert should_refresh_early(now - 1, computed_in=0.01)  # уже устарела
+    assert not should_refresh_early(now + 300, computed_in=0.01)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_result_and_errors():
+    flights = SingleFlight()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(flights.do("k", load) for _ in range(10)))
+    assert results == [1] * 10
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        *(flights.do("k", fail) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_retries_after_leader_cancelled():
+    flights = SingleFlight()
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(10)
+
+    async def fast():
+        return "ok"
+
+    leader = asyncio.create_task(flights.do("k", slow))
+    await started.wait()
+    follower = asyncio.create_task(flights.do("k", fast))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == "ok"
@@ -0,0 +1,50 @@
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.db.session import InstrumentedQueuePool
+
+
+def sample(name: str, pool: str) -> float:
+    return REGISTRY.get_sample_value(name, {"pool": pool})
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics():
+    """Метрики пула отражают выданные соединения и overflow."""
+    url = settings.DATABASE_URL.replace("todo_db", "todo_test_db")
+    engine = create_async_engine(
+        url=url, poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=1,
+    )
+    engine.pool.name = "test"
+    # второй пул с другим именем не перетирает метрики первого
+    other = create_async_engine(url=url, poolclass=InstrumentedQueuePool)
+    other.pool.name = "test-other"
+    waits_before = sample("db_pool_checkout_wait_seconds_count", "test") or 0
+    try:
+        async with engine.connect() as first, engine.connect() as second:
+            await first.execute(text("SELECT 1"))
+            await second.execute(text("SELECT 1"))
+            async with other.connect() as third:
+                await third.execute(text("SELECT 1"))
+            assert sample("db_pool_checked_out", "test") == 2
+            assert sample("db_pool_overflow", "test") == 1
+            assert sample("db_pool_checked_out", "test-other") == 0
+        assert sample("db_pool_checked_out", "test") == 0
+        assert sample("db_pool_checkout_wait_seconds_count", "test") == (
+            waits_before + 2
+        )
+    finally:
+        await engine.dispose()
+        await other.dispose()
+    # dispose() пересоздает пул, имя сохраняется
+    assert engine.pool.name == "test"
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(client):
+    response = await client.get("/metrics/")
+    assert response.status_code == 200
+    assert "db_pool_checkout_wait_seconds" in response.text
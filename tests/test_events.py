@@ -0,0 +1,191 @@
+import asyncio
+import json
+import tracemalloc
+
+import pytest
+from httpx import AsyncClient
+
+from app.api.v1.endpoints.tasks import _sse_events
+from app.core.events import TASK_EVENTS_CHANNEL, RESYNC_EVENT, TaskEvent, task_events
+from app.main import app
+
+
+async def open_stream(headers: dict):
+    """
+    Вызывает ASGI-приложение напрямую: httpx.ASGITransport
+    ждет конца тела ответа, а поток событий бесконечен
+    """
+    messages: asyncio.Queue = asyncio.Queue()
+    disconnected = asyncio.Event()
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/v1/tasks/stream",
+        "raw_path": b"/api/v1/tasks/stream",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (name.lower().encode(), value.encode())
+            for name, value in headers.items()
+        ],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+    task = asyncio.create_task(app(scope, receive, messages.put))
+    return messages, disconnected, task
+
+
+@pytest.mark.asyncio
+async def test_stream_delivers_task_events(client: AsyncClient, test_user):
+    messages, disconnected, stream = await open_stream(test_user["headers"])
+    start = await asyncio.wait_for(messages.get(), 5)
+    assert start["status"] == 200
+    assert (await messages.get())["body"] == b"retry: 3000\n\n"
+
+    response = await client.post(
+        '/api/v1/tasks/',
+        json={"title": "Pushed"},
+        headers=test_user["headers"]
+    )
+    # Событие ушло в Redis тем же пакетом, что и инвалидация;
+    # здесь Redis — мок, поэтому доставляем сообщение сами
+    pipe = app.state.redis.pipeline.return_value
+    published = [
+        call.args[1] for call in pipe.publish.call_args_list
+        if call.args[0] == TASK_EVENTS_CHANNEL
+    ]
+    assert len(published) == 1
+    task_events._handle_message(published[0])
+
+    body = (await asyncio.wait_for(messages.get(), 5))["body"]
+    event, data = body.decode().strip().split("\n")
+    assert event == "event: created"
+    assert json.loads(data.removeprefix("data: ")) == [response.json()]
+
+    disconnected.set()
+    await asyncio.wait_for(stream, 5)
+    assert not task_events._queues
+
+
+@pytest.mark.asyncio
+async def test_idle_event_generators_memory_is_bounded():
+    """
+    10k простаивающих генераторов событий без HTTP-слоя: очередь,
+    генератор и задача. Полный путь подключения — в следующем тесте
+    """
+    connections = 10_000
+
+    async def consume(owner_id: int, received: list):
+        async for chunk in _sse_events(owner_id):
+            received.append(chunk)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    received: list[bytes] = []
+    consumers = [
+        asyncio.create_task(consume(i % 1000, received))
+        for i in range(connections)
+    ]
+    await asyncio.sleep(0.1)
+    per_connection = (tracemalloc.get_traced_memory()[0] - before) / connections
+    tracemalloc.stop()
+    # генератор, задача и очередь; соединений с Redis и БД нет
+    assert per_connection < 4096
+
+    received.clear()
+    task_events.dispatch(7, TaskEvent("deleted", b"[1]"))
+    await asyncio.sleep(0)
+    assert received == [b"event: deleted\ndata: [1]\n\n"] * 10
+
+    for consumer in consumers:
+        consumer.cancel()
+    await asyncio.gather(*consumers, return_exceptions=True)
+    assert not task_events._queues
+
+
+@pytest.mark.asyncio
+async def test_idle_stream_connections_memory_is_bounded(
+    client: AsyncClient, test_user
+):
+    """
+    Простаивающие подключения к /api/v1/tasks/stream через все
+    приложение: middleware, аутентификация, StreamingResponse,
+    его задачи и очередь событий
+    """
+    connections = 1000
+    headers = [
+        (name.lower().encode(), value.encode())
+        for name, value in test_user["headers"].items()
+    ]
+    disconnected = asyncio.Event()
+    connected = 0
+    all_connected = asyncio.Event()
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal connected
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200
+        elif message["body"] == b"retry: 3000\n\n":
+            connected += 1
+            if connected == connections:
+                all_connected.set()
+
+    def connect(number: int) -> asyncio.Task:
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/api/v1/tasks/stream",
+            "raw_path": b"/api/v1/tasks/stream",
+            "query_string": b"",
+            "root_path": "",
+            "headers": headers,
+            "client": ("test", number),
+            "server": ("test", 80),
+        }
+        return asyncio.create_task(app(scope, receive, send))
+
+    # первое подключение кладет пользователя в кеш, остальные
+    # аутентифицируются без БД, как на прогретом воркере
+    streams = [connect(0)]
+    while not connected:
+        await asyncio.sleep(0.01)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    streams += [connect(i) for i in range(1, connections)]
+    await asyncio.wait_for(all_connected.wait(), 30)
+    per_connection = (
+        (tracemalloc.get_traced_memory()[0] - before) / (connections - 1)
+    )
+    tracemalloc.stop()
+    # ~20 КБ: большая часть — кадры Starlette (стек middleware,
+    # две задачи StreamingResponse), своя очередь и генератор < 3 КБ
+    assert per_connection < 24 * 1024
+
+    disconnected.set()
+    await asyncio.wait_for(asyncio.gather(*streams), 30)
+    assert not task_events._queues
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_gets_resync():
+    with task_events.subscribe(1) as queue:
+        for i in range(task_events.queue_size + 1):
+            task_events.dispatch(1, TaskEvent("deleted", b"[%d]" % i))
+        assert queue.qsize() == 1
+        assert queue.get_nowait() == RESYNC_EVENT
@@ -0,0 +1,71 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from httpx import AsyncClient
+from prometheus_client import REGISTRY
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+from app.core.redis import InstrumentedRedis
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.asyncio
+async def test_request_metrics_per_route(client: AsyncClient, test_user):
+    response = await client.post(
+        '/api/v1/tasks/',
+        json={"title": "Measured"},
+        headers=test_user["headers"]
+    )
+    task_id = response.json()["id"]
+    route = "/api/v1/tasks/{task_id}"
+    labels = {"method": "GET", "route": route, "status": "200"}
+    requests_before = sample("http_request_duration_seconds_count", **labels)
+    queries_before = sample("db_queries_per_request_sum", route=route)
+    selects_before = sample("db_query_duration_seconds_count", operation="SELECT")
+
+    await client.get(f'/api/v1/tasks/{task_id}', headers=test_user["headers"])
+
+    assert sample("http_request_duration_seconds_count", **labels) == (
+        requests_before + 1
+    )
+    assert sample("db_queries_per_request_sum", route=route) > queries_before
+    assert sample(
+        "db_query_duration_seconds_count", operation="SELECT"
+    ) > selects_before
+    assert sample("http_requests_in_progress", method="GET") == 0
+
+    # Несуществующие пути не плодят ряды метрик
+    unmatched = {"method": "GET", "route": "<unmatched>", "status": "404"}
+    before = sample("http_request_duration_seconds_count", **unmatched)
+    await client.get(f'/no/such/path/{task_id}')
+    assert sample("http_request_duration_seconds_count", **unmatched) == (
+        before + 1
+    )
+
+
+@pytest.mark.asyncio
+async def test_redis_command_metrics(monkeypatch):
+    monkeypatch.setattr(Redis, "execute_command", AsyncMock(return_value=b"1"))
+    monkeypatch.setattr(Pipeline, "execute", AsyncMock(return_value=[]))
+    redis = InstrumentedRedis()
+    gets_before = sample("redis_command_duration_seconds_count", command="GET")
+    pipelines_before = sample(
+        "redis_command_duration_seconds_count", command="PIPELINE"
+    )
+
+    await redis.get("key")
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.incr("key")
+        await pipe.execute()
+
+    assert sample("redis_command_duration_seconds_count", command="GET") == (
+        gets_before + 1
+    )
+    assert sample(
+        "redis_command_duration_seconds_count", command="PIPELINE"
+    ) == pipelines_before + 1
+    await redis.aclose()
@@ -0,0 +1,90 @@
+import logging
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import RequestStats, request_stats
+from app.core.profiling import QueryProfile
+from app.models.task import Task
+from tests.query_budget import QueryBudget
+
+
+async def create_task(client: AsyncClient, headers: dict) -> dict:
+    response = await client.post(
+        '/api/v1/tasks/', json={"title": "Profiled"}, headers=headers
+    )
+    return response.json()
+
+
+@pytest.mark.asyncio
+async def test_server_timing_and_profile_log(
+    client: AsyncClient, test_user, monkeypatch, caplog
+):
+    task = await create_task(client, test_user["headers"])
+    monkeypatch.setattr(settings, "DB_QUERY_PROFILING", True)
+
+    with caplog.at_level(logging.INFO, logger="app.core.profiling"):
+        response = await client.get(
+            f'/api/v1/tasks/{task["id"]}', headers=test_user["headers"]
+        )
+
+    assert response.headers["server-timing"].startswith("db;dur=")
+    [record] = [r for r in caplog.records if r.name == "app.core.profiling"]
+    assert '"route": "/api/v1/tasks/{task_id}"' in record.getMessage()
+
+    monkeypatch.setattr(settings, "DB_QUERY_PROFILING", False)
+    response = await client.get(
+        f'/api/v1/tasks/{task["id"]}', headers=test_user["headers"]
+    )
+    assert "server-timing" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_profile_detects_duplicates_and_lazy_loads(
+    client: AsyncClient, test_user, session: AsyncSession
+):
+    for _ in range(2):
+        await create_task(client, test_user["headers"])
+    session.expunge_all()
+
+    profile = QueryProfile()
+    token = request_stats.set(RequestStats(profile=profile))
+    try:
+        tasks = (await session.scalars(select(Task))).all()
+        # N+1: связь грузится отдельным запросом на каждый объект
+        for task in tasks:
+            await session.get(Task, task.id, populate_existing=True)
+        await session.run_sync(lambda _: tasks[0].owner)
+    finally:
+        request_stats.reset(token)
+
+    assert list(profile.duplicates().values()) == [2]
+    assert profile.lazy_loads == {"Task.owner": 1}
+    assert profile.queries == 4
+
+
+@pytest.mark.asyncio
+@pytest.mark.query_budget(1, endpoint="GET /api/v1/tasks/{task_id}")
+async def test_read_task_query_budget(client: AsyncClient, test_user):
+    task = await create_task(client, test_user["headers"])
+    await client.get(f'/api/v1/tasks/{task["id"]}', headers=test_user["headers"])
+
+
+def test_query_budget_reports_violations():
+    budget = QueryBudget(1, endpoint="GET /api/v1/tasks/")
+    profile = QueryProfile()
+    profile.record("SELECT 1", 0.001)
+    budget.check("GET", "/api/v1/tasks/", profile)
+    budget.check("POST", "/api/v1/tasks/", profile)
+    assert budget.checked == 1 and not budget.violations
+
+    profile.record("SELECT 1", 0.001)
+    profile.lazy_loads["User.tasks"] += 1
+    budget.check("GET", "/api/v1/tasks/", profile)
+    [violation] = budget.violations
+    assert "2 queries (budget 1)" in violation
+    assert "2x SELECT 1" in violation
+    assert "lazy load User.tasks x1" in violation
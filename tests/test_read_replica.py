@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import get_replica_db
+from app.main import app
+
+
+@pytest.mark.asyncio
+async def test_read_your_writes(client, test_user, test_engine, monkeypatch):
+    """
+    «Реплика» — сессия со снимком REPEATABLE READ, сделанным до записи,
+    то есть отстающая реплика. Пока открыто окно read-your-writes,
+    чтение идет на primary и видит новую задачу, после — на реплику.
+    """
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URL", "replica")
+    redis = app.state.redis
+
+    async with test_engine.connect() as conn:
+        await conn.execution_options(isolation_level="REPEATABLE READ")
+        await conn.begin()
+        await conn.execute(text("SELECT 1"))  # фиксирует снимок
+        # внешнюю транзакцию commit() сессии не завершает
+        replica = AsyncSession(bind=conn, expire_on_commit=False)
+
+        async def override_get_replica_db():
+            yield replica
+
+        app.dependency_overrides[get_replica_db] = override_get_replica_db
+
+        response = await client.post(
+            "/api/v1/tasks/",
+            json={"title": "Fresh"},
+            headers=test_user["headers"],
+        )
+        task_id = response.json()["id"]
+        redis.pipeline.return_value.set.assert_any_await(
+            f"user:{response.json()['owner_id']}:recent_write",
+            1,
+            ex=settings.READ_YOUR_WRITES_WINDOW,
+        )
+
+        redis.exists.return_value = 1
+        response = await client.get(
+            f"/api/v1/tasks/{task_id}", headers=test_user["headers"]
+        )
+        assert response.status_code == 200
+
+        redis.exists.return_value = 0
+        response = await client.get(
+            f"/api/v1/tasks/{task_id}", headers=test_user["headers"]
+        )
+        assert response.status_code == 404
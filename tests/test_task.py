@@ -1,5 +1,22 @@
+import asyncio
+import csv
+import io
+import json
+import tracemalloc
+import uuid
+from datetime import datetime
+
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.pagination import encode_cursor
+from app.crud.task import prune_task_deletions, task_list_cache, tasks_json
+from app.main import app
+from app.models.task import Task
+from app.schemas.task import TaskListAdapter
 
 
 @pytest.mark.asyncio
@@ -51,3 +68,708 @@ async def test_get_tasks_with_data(client: AsyncClient, test_user):
     # Находим нашу задачу по ID или title
     task_ids = [t["id"] for t in tasks]
     assert created_task["id"] in task_ids
+
+
+@pytest.mark.asyncio
+async def test_read_releases_connection(
+    client: AsyncClient, test_user, session
+):
+    """После чтения сессия не держит транзакцию (и соединение из пула)."""
+    create_response = await client.post(
+        '/api/v1/tasks/',
+        json={"title": "Task"},
+        headers=test_user["headers"]
+    )
+    task_id = create_response.json()["id"]
+
+    response = await client.get(
+        f'/api/v1/tasks/{task_id}',
+        headers=test_user["headers"]
+    )
+    assert response.status_code == 200
+    assert response.json()["title"] == "Task"
+    assert not session.in_transaction()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_cache_misses_run_one_query(
+    client: AsyncClient, test_user, test_engine
+):
+    """500 одновременных промахов по одной странице — один SELECT."""
+    create_response = await client.post(
+        '/api/v1/tasks/',
+        json={"title": "Hot task"},
+        headers=test_user["headers"]
+    )
+    # прогреваем кеш пользователя, чтобы считать только запросы задач
+    await client.get(
+        f'/api/v1/tasks/{create_response.json()["id"]}',
+        headers=test_user["headers"]
+    )
+    task_list_cache.clear()
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        if "FROM tasks" in statement:
+            statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", count_statement)
+    try:
+        responses = await asyncio.gather(*(
+            client.get('/api/v1/tasks/', headers=test_user["headers"])
+            for _ in range(500)
+        ))
+    finally:
+        event.remove(
+            test_engine.sync_engine, "before_cursor_execute", count_statement
+        )
+
+    assert {response.status_code for response in responses} == {200}
+    assert {response.content for response in responses} == {responses[0].content}
+    assert responses[0].json()[0]["title"] == "Hot task"
+    assert len(statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_tasks_cursor_pagination(client: AsyncClient, test_user):
+    for i in range(3):
+        await client.post(
+            '/api/v1/tasks/',
+            json={"title": f"Task {i}"},
+            headers=test_user["headers"]
+        )
+
+    first_page = await client.get(
+        '/api/v1/tasks/',
+        params={"limit": 2},
+        headers=test_user["headers"]
+    )
+    assert first_page.status_code == 200
+    assert [t["title"] for t in first_page.json()] == ["Task 0", "Task 1"]
+    cursor = first_page.headers["X-Next-Cursor"]
+
+    second_page = await client.get(
+        '/api/v1/tasks/',
+        params={"limit": 2, "after": cursor},
+        headers=test_user["headers"]
+    )
+    assert second_page.status_code == 200
+    assert [t["title"] for t in second_page.json()] == ["Task 2"]
+    assert "X-Next-Cursor" not in second_page.headers
+
+
+@pytest.mark.asyncio
+async def test_get_tasks_invalid_cursor(client: AsyncClient, test_user):
+    response = await client.get(
+        '/api/v1/tasks/',
+        params={"after": "not-a-cursor"},
+        headers=test_user["headers"]
+    )
+    assert response.status_code == 400
+
+    # время с часовым поясом не сравнить с naive-колонками БД
+    aware = encode_cursor({"v": "2024-01-01T00:00:00+00:00", "id": 1})
+    response = await client.get(
+        '/api/v1/tasks/',
+        params={"sort": "updated_at", "after": aware},
+        headers=test_user["headers"]
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_batch_create_update_delete(client: AsyncClient, test_user):
+    create_response = await client.post(
+        '/api/v1/tasks/batch',
+        json={"items": [{"title": f"Batch {i}"} for i in range(3)]},
+        headers=test_user["headers"]
+    )
+    assert create_response.status_code == 201
+    created = create_response.json()
+    assert [t["title"] for t in created] == ["Batch 0", "Batch 1", "Batch 2"]
+    ids = [t["id"] for t in created]
+
+    update_response = await client.patch(
+        '/api/v1/tasks/batch',
+        json={"items": [
+            {"id": ids[0], "completed": True},
+            {"id": ids[1], "completed": True},
+            {"id": ids[2], "title": "Renamed"},
+        ]},
+        headers=test_user["headers"]
+    )
+    assert update_response.status_code == 200
+    updated = update_response.json()
+    assert [t["id"] for t in updated] == ids
+    assert [t["completed"] for t in updated] == [True, True, False]
+    assert updated[2]["title"] == "Renamed"
+
+    delete_response = await client.request(
+        "DELETE",
+        '/api/v1/tasks/batch',
+        json={"ids": ids[:2]},
+        headers=test_user["headers"]
+    )
+    assert delete_response.status_code == 204
+
+    list_response = await client.get(
+        '/api/v1/tasks/',
+        headers=test_user["headers"]
+    )
+    assert [t["id"] for t in list_response.json()] == [ids[2]]
+
+
+@pytest.mark.asyncio
+async def test_batch_update_rejects_foreign_tasks(
+    client: AsyncClient, test_user
+):
+    own = await client.post(
+        '/api/v1/tasks/',
+        json={"title": "Mine"},
+        headers=test_user["headers"]
+    )
+    other_email = f"other{uuid.uuid4()}@example.com"
+    await client.post('/api/v1/auth/register', json={
+        "email": other_email,
+        "password": "otherpass123"
+    })
+    login = await client.post('/api/v1/auth/login', data={
+        "username": other_email,
+        "password": "otherpass123"
+    })
+    other_headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    foreign = await client.post(
+        '/api/v1/tasks/',
+        json={"title": "Not mine"},
+        headers=other_headers
+    )
+
+    response = await client.patch(
+        '/api/v1/tasks/batch',
+        json={"items": [
+            {"id": own.json()["id"], "completed": True},
+            {"id": foreign.json()["id"], "completed": True},
+        ]},
+        headers=test_user["headers"]
+    )
+    assert response.status_code == 403
+
+    task = await client.get(
+        f'/api/v1/tasks/{own.json()["id"]}',
+        headers=test_user["headers"]
+    )
+    assert task.json()["completed"] is False
+
+
+@pytest.mark.asyncio
+async def test_update_and_delete_task(client: AsyncClient, test_user):
+    create_response = await client.post(
+        '/api/v1/tasks/',
+        json={"title": "Before"},
+        headers=test_user["headers"]
+    )
+    task_id = create_response.json()["id"]
+
+    update_response = await client.patch(
+        f'/api/v1/tasks/{task_id}',
+        json={"title": "After", "completed": True},
+        headers=test_user["headers"]
+    )
+    assert update_response.status_code == 200
+    assert update_response.json()["title"] == "After"
+    assert update_response.json()["completed"] is True
+
+    delete_response = await client.delete(
+        f'/api/v1/tasks/{task_id}',
+        headers=test_user["headers"]
+    )
+    assert delete_response.status_code == 204
+
+    missing_response = await client.patch(
+        f'/api/v1/tasks/{task_id}',
+        json={"title": "Again"},
+        headers=test_user["headers"]
+    )
+    assert missing_response.status_code == 404
+    missing_delete = await client.delete(
+        f'/api/v1/tasks/{task_id}',
+        headers=test_user["headers"]
+    )
+    assert missing_delete.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_update_foreign_task_forbidden(client: AsyncClient, test_user):
+    other_email = f"other{uuid.uuid4()}@example.com"
+    await client.post('/api/v1/auth/register', json={
+        "email": other_email,
+        "password": "otherpass123"
+    })
+    login = await client.post('/api/v1/auth/login', data={
+        "username": other_email,
+        "password": "otherpass123"
+    })
+    other_headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    foreign = await client.post(
+        '/api/v1/tasks/',
+        json={"title": "Not mine"},
+        headers=other_headers
+    )
+    task_id = foreign.json()["id"]
+
+    update_response = await client.patch(
+        f'/api/v1/tasks/{task_id}',
+        json={"title": "Hijacked"},
+        headers=test_user["headers"]
+    )
+    assert update_response.status_code == 403
+    delete_response = await client.delete(
+        f'/api/v1/tasks/{task_id}',
+        headers=test_user["headers"]
+    )
+    assert delete_response.status_code == 403
+
+    task = await client.get(f'/api/v1/tasks/{task_id}', headers=other_headers)
+    assert task.json()["title"] == "Not mine"
+
+
+@pytest.mark.asyncio
+async def test_export_tasks(client: AsyncClient, test_user):
+    await client.post(
+        '/api/v1/tasks/batch',
+        json={"items": [{"title": "First"}, {"title": "Second, with comma"}]},
+        headers=test_user["headers"]
+    )
+
+    ndjson_response = await client.get(
+        '/api/v1/tasks/export',
+        headers=test_user["headers"]
+    )
+    assert ndjson_response.status_code == 200
+    assert ndjson_response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in ndjson_response.text.splitlines()]
+    assert [t["title"] for t in lines] == ["First", "Second, with comma"]
+    # построчно тот же JSON, что и в списке задач
+    list_response = await client.get(
+        '/api/v1/tasks/', headers=test_user["headers"]
+    )
+    assert lines == list_response.json()
+
+    csv_response = await client.get(
+        '/api/v1/tasks/export',
+        params={"format": "csv"},
+        headers=test_user["headers"]
+    )
+    assert csv_response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(csv_response.text)))
+    assert [row["title"] for row in rows] == ["First", "Second, with comma"]
+
+
+@pytest.mark.asyncio
+async def test_export_memory_is_bounded(
+    client: AsyncClient, test_user, session: AsyncSession
+):
+    """Пик памяти при выгрузке не растет с количеством задач"""
+    rows = 30_000
+    await session.execute(
+        text(
+            "INSERT INTO tasks (title, description, completed, owner_id) "
+            "SELECT 'Task ' || i, 'Lorem ipsum dolor sit amet', i % 2 = 0, "
+            "(SELECT id FROM users WHERE email = :email) "
+            "FROM generate_series(1, :rows) AS i"
+        ),
+        {"email": test_user["email"], "rows": rows},
+    )
+    await session.commit()
+
+    received = 0
+    done = asyncio.Event()
+
+    async def receive():
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        # куски тела сразу выбрасываются, как их отправил бы сервер
+        nonlocal received
+        if message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+            if not message.get("more_body", False):
+                done.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/v1/tasks/export",
+        "raw_path": b"/api/v1/tasks/export",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"authorization", test_user["headers"]["Authorization"].encode())
+        ],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+    tracemalloc.start()
+    try:
+        await app(scope, receive, send)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    # ~200 байт на задачу; в памяти — пачка по 1000 строк, а не вся выгрузка
+    assert received > rows * 150
+    assert peak < 2.5 * 2**20
+    assert peak < received / 2
+
+
+@pytest.mark.asyncio
+async def test_conditional_get(client: AsyncClient, test_user):
+    create_response = await client.post(
+        '/api/v1/tasks/',
+        json={"title": "Cached"},
+        headers=test_user["headers"]
+    )
+    task_id = create_response.json()["id"]
+
+    list_response = await client.get(
+        '/api/v1/tasks/',
+        headers=test_user["headers"]
+    )
+    etag = list_response.headers["ETag"]
+    not_modified = await client.get(
+        '/api/v1/tasks/',
+        headers={**test_user["headers"], "If-None-Match": f"W/{etag}"}
+    )
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    task_response = await client.get(
+        f'/api/v1/tasks/{task_id}',
+        headers=test_user["headers"]
+    )
+    assert task_response.headers["ETag"] == create_response.headers["ETag"]
+    not_modified = await client.get(
+        f'/api/v1/tasks/{task_id}',
+        headers={
+            **test_user["headers"],
+            "If-Modified-Since": task_response.headers["Last-Modified"],
+        }
+    )
+    assert not_modified.status_code == 304
+
+    await client.patch(
+        f'/api/v1/tasks/{task_id}',
+        json={"completed": True},
+        headers=test_user["headers"]
+    )
+    modified = await client.get(
+        '/api/v1/tasks/',
+        headers={**test_user["headers"], "If-None-Match": etag}
+    )
+    assert modified.status_code == 200
+    assert modified.json()[0]["completed"] is True
+    modified = await client.get(
+        f'/api/v1/tasks/{task_id}',
+        headers={
+            **test_user["headers"],
+            "If-None-Match": task_response.headers["ETag"],
+        }
+    )
+    assert modified.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_if_match_update_and_delete(client: AsyncClient, test_user):
+    create_response = await client.post(
+        '/api/v1/tasks/',
+        json={"title": "Before"},
+        headers=test_user["headers"]
+    )
+    task_id = create_response.json()["id"]
+    etag = create_response.headers["ETag"]
+
+    update_response = await client.patch(
+        f'/api/v1/tasks/{task_id}',
+        json={"title": "After"},
+        headers={**test_user["headers"], "If-Match": etag}
+    )
+    assert update_response.status_code == 200
+    assert update_response.headers["ETag"] != etag
+
+    # Клиент со старым ETag не затирает чужое изменение
+    stale_update = await client.patch(
+        f'/api/v1/tasks/{task_id}',
+        json={"title": "Lost update"},
+        headers={**test_user["headers"], "If-Match": etag}
+    )
+    assert stale_update.status_code == 412
+    stale_delete = await client.delete(
+        f'/api/v1/tasks/{task_id}',
+        headers={**test_user["headers"], "If-Match": etag}
+    )
+    assert stale_delete.status_code == 412
+
+    task_response = await client.get(
+        f'/api/v1/tasks/{task_id}',
+        headers=test_user["headers"]
+    )
+    assert task_response.json()["title"] == "After"
+
+    delete_response = await client.delete(
+        f'/api/v1/tasks/{task_id}',
+        headers={
+            **test_user["headers"],
+            "If-Match": f'{etag}, {update_response.headers["ETag"]}',
+        }
+    )
+    assert delete_response.status_code == 204
+    missing_response = await client.patch(
+        f'/api/v1/tasks/{task_id}',
+        json={"title": "Again"},
+        headers={**test_user["headers"], "If-Match": "*"}
+    )
+    assert missing_response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_task_changes_sync(
+    client: AsyncClient, test_user, session: AsyncSession, monkeypatch
+):
+    monkeypatch.setattr(settings, "TASKS_SYNC_SAFETY_LAG", 0)
+    ids = []
+    for i in range(3):
+        response = await client.post(
+            '/api/v1/tasks/',
+            json={"title": f"Task {i}"},
+            headers=test_user["headers"]
+        )
+        ids.append(response.json()["id"])
+
+    # Полная синхронизация страницами
+    first = (await client.get(
+        '/api/v1/tasks/changes',
+        params={"limit": 2},
+        headers=test_user["headers"]
+    )).json()
+    assert first["has_more"] is True
+    second = (await client.get(
+        '/api/v1/tasks/changes',
+        params={"limit": 2, "since": first["next_token"]},
+        headers=test_user["headers"]
+    )).json()
+    assert second["has_more"] is False
+    synced = [task["id"] for task in first["changed"] + second["changed"]]
+    assert synced == ids
+
+    await client.patch(
+        f'/api/v1/tasks/{ids[0]}',
+        json={"completed": True},
+        headers=test_user["headers"]
+    )
+    await client.delete(
+        f'/api/v1/tasks/{ids[1]}',
+        headers=test_user["headers"]
+    )
+    delta = (await client.get(
+        '/api/v1/tasks/changes',
+        params={"since": second["next_token"]},
+        headers=test_user["headers"]
+    )).json()
+    assert [task["id"] for task in delta["changed"]] == [ids[0]]
+    assert delta["changed"][0]["completed"] is True
+    assert delta["deleted"] == [ids[1]]
+
+    empty = (await client.get(
+        '/api/v1/tasks/changes',
+        params={"since": delta["next_token"]},
+        headers=test_user["headers"]
+    )).json()
+    assert empty["changed"] == [] and empty["deleted"] == []
+
+    invalid = await client.get(
+        '/api/v1/tasks/changes',
+        params={"since": "garbage"},
+        headers=test_user["headers"]
+    )
+    assert invalid.status_code == 400
+    # время с часовым поясом не сравнить с naive-колонками БД
+    aware = await client.get(
+        '/api/v1/tasks/changes',
+        params={"since": encode_cursor({"t": "2024-01-01T00:00:00+00:00", "id": 0})},
+        headers=test_user["headers"]
+    )
+    assert aware.status_code == 400
+    monkeypatch.setattr(settings, "TASKS_SYNC_RETENTION_DAYS", 0)
+    expired = await client.get(
+        '/api/v1/tasks/changes',
+        params={"since": first["next_token"]},
+        headers=test_user["headers"]
+    )
+    assert expired.status_code == 410
+
+    # Токен страницы при has_more не заходит за watermark: транзакция,
+    # начатая в окне TASKS_SYNC_SAFETY_LAG, коммитится позже и иначе
+    # оказалась бы ниже токена
+    monkeypatch.setattr(settings, "TASKS_SYNC_RETENTION_DAYS", 30)
+    monkeypatch.setattr(settings, "TASKS_SYNC_SAFETY_LAG", 5)
+    await session.execute(text(
+        "UPDATE tasks SET updated_at = updated_at - interval '60 seconds'"
+    ))
+    await session.commit()
+    fresh = []
+    for i in range(3):
+        response = await client.post(
+            '/api/v1/tasks/',
+            json={"title": f"Fresh {i}"},
+            headers=test_user["headers"]
+        )
+        fresh.append(response.json()["id"])
+    page = (await client.get(
+        '/api/v1/tasks/changes',
+        params={"limit": 3},
+        headers=test_user["headers"]
+    )).json()
+    assert page["has_more"] is True
+    assert [task["id"] for task in page["changed"]] == [ids[2], ids[0]]
+
+    late = (await client.post(
+        '/api/v1/tasks/',
+        json={"title": "Late"},
+        headers=test_user["headers"]
+    )).json()["id"]
+    await session.execute(
+        text(
+            "UPDATE tasks SET updated_at = localtimestamp - interval '1 second' "
+            "WHERE id = :id"
+        ),
+        {"id": late}
+    )
+    await session.commit()
+    # все оставшиеся изменения свежее watermark и не влезают в страницу
+    page = (await client.get(
+        '/api/v1/tasks/changes',
+        params={"limit": 3, "since": page["next_token"]},
+        headers=test_user["headers"]
+    )).json()
+    assert page["changed"] == [] and page["has_more"] is False
+
+    monkeypatch.setattr(settings, "TASKS_SYNC_SAFETY_LAG", 0)
+    page = (await client.get(
+        '/api/v1/tasks/changes',
+        params={"since": page["next_token"]},
+        headers=test_user["headers"]
+    )).json()
+    assert sorted(task["id"] for task in page["changed"]) == sorted(fresh + [late])
+
+
+@pytest.mark.asyncio
+async def test_prune_task_deletions(
+    client: AsyncClient, test_user, session: AsyncSession
+):
+    ids = []
+    for i in range(2):
+        response = await client.post(
+            '/api/v1/tasks/',
+            json={"title": f"Task {i}"},
+            headers=test_user["headers"]
+        )
+        ids.append(response.json()["id"])
+        await client.delete(
+            f'/api/v1/tasks/{ids[-1]}',
+            headers=test_user["headers"]
+        )
+    await session.execute(
+        text(
+            "UPDATE task_deletions "
+            "SET deleted_at = deleted_at - make_interval(days => :days) "
+            "WHERE task_id = :task_id"
+        ),
+        {
+            "days": settings.TASKS_SYNC_RETENTION_DAYS + 1,
+            "task_id": ids[0],
+        }
+    )
+    await session.commit()
+
+    assert await prune_task_deletions(session) == 1
+    remaining = await session.scalars(text("SELECT task_id FROM task_deletions"))
+    assert remaining.all() == [ids[1]]
+
+
+@pytest.mark.asyncio
+async def test_filter_sort_and_search(client: AsyncClient, test_user):
+    titles = ["Купить молоко", "Write report", "Купить хлеб", "Call mom"]
+    ids = []
+    for title in titles:
+        response = await client.post(
+            '/api/v1/tasks/',
+            json={"title": title, "completed": title.startswith("Купить")},
+            headers=test_user["headers"]
+        )
+        ids.append(response.json()["id"])
+
+    async def list_ids(**params):
+        response = await client.get(
+            '/api/v1/tasks/', params=params, headers=test_user["headers"]
+        )
+        assert response.status_code == 200, response.text
+        return [task["id"] for task in response.json()], response
+
+    assert (await list_ids(completed=True))[0] == [ids[0], ids[2]]
+    assert (await list_ids(completed=False))[0] == [ids[1], ids[3]]
+    # стемминг: "купил" находит "Купить", латиница — английским стеммером
+    assert (await list_ids(q="купил"))[0] == [ids[0], ids[2]]
+    assert (await list_ids(q="reports"))[0] == [ids[1]]
+    assert (await list_ids(q="купить -хлеб"))[0] == [ids[0]]
+
+    # Сортировка по убыванию с курсором по (created_at, id)
+    first, response = await list_ids(sort="-created_at", limit=3)
+    assert first == ids[::-1][:3]
+    rest, _ = await list_ids(
+        sort="-created_at", after=response.headers["X-Next-Cursor"]
+    )
+    assert rest == [ids[0]]
+
+    task = (await client.get(
+        f'/api/v1/tasks/{ids[2]}', headers=test_user["headers"]
+    )).json()
+    in_range, _ = await list_ids(
+        created_from=task["created_at"], created_to="2999-01-01T00:00:00Z"
+    )
+    assert in_range == ids[2:]
+
+    # Курсор сортировки по id не подходит для сортировки по дате
+    _, response = await list_ids(limit=1)
+    invalid = await client.get(
+        '/api/v1/tasks/',
+        params={"sort": "updated_at", "after": response.headers["X-Next-Cursor"]},
+        headers=test_user["headers"]
+    )
+    assert invalid.status_code == 400
+
+
+def test_tasks_json_matches_schema():
+    """Payload кеша из ORM-объектов совпадает с сериализацией TaskOut"""
+    tasks = [
+        Task(
+            id=1, title="Ёлка \"🎄\"", description=None, completed=False,
+            created_at=datetime(2024, 1, 2, 3, 4, 5),
+            updated_at=datetime(2024, 1, 2, 3, 4, 5, 123456),
+            owner_id=7,
+        ),
+        Task(
+            id=2, title="b", description="line\nbreak", completed=True,
+            created_at=datetime(2024, 12, 31, 23, 59, 59, 1),
+            updated_at=datetime(2025, 1, 1),
+            owner_id=7,
+        ),
+    ]
+    assert tasks_json(tasks) == TaskListAdapter.dump_json(
+        TaskListAdapter.validate_python(tasks, from_attributes=True)
+    )
+    assert tasks_json([]) == b"[]"